@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Result Cache - Content-addressed disk cache for indicators and metrics
+
+Entries are named by a SHA-256 of everything that determines them: the
+data (hashed by content, not by file name), the strategy's class, params
+and rules, the engine settings, and the source of the modules that
+compute them. Rerunning an unchanged backtest or sweep combination finds
+its metrics, and an indicator already computed on the same bars is
+loaded rather than recomputed. Editing the data, a param or the engine
+code yields a new key, so stale entries are never read. They are simply
+left to eviction.
+
+Files live under results/cache/<kind>/<key[:2]>/. A read bumps a file's
+mtime, and when the cache outgrows max_bytes the least recently used
+files are deleted first. Writes go to a temporary file that is renamed
+into place, so worker processes can share the cache.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, Optional
+
+import numpy as np
+
+CACHE_DIR = os.path.join("results", "cache")
+MAX_BYTES = 256 * 1024 * 1024
+
+# Modules whose source decides a backtest's outcome
+ENGINE_MODULES = ("backtest.engine", "backtest.execution", "backtest.ledger", "backtest.metrics",
+                  "data.bars", "strategies.base", "strategies.rules")
+
+_code_digests = {}
+
+
+def digest(*parts) -> str:
+    """SHA-256 hex of parts as key-sorted JSON (tuples and lists hash alike)"""
+    text = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def frame_digest(df) -> str:
+    """Content hash of a frame's columns, independent of its index and of where it was loaded from"""
+    import pandas as pd
+    
+    h = hashlib.sha256(json.dumps([[col, str(df[col].dtype)] for col in df.columns]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def code_digest(*modules) -> str:
+    """Hash of the source files of the given (imported) modules, cached per process"""
+    key = tuple(sorted(set(modules)))
+    if key not in _code_digests:
+        h = hashlib.sha256()
+        for name in key:
+            path = getattr(sys.modules.get(name), "__file__", None)
+            h.update(name.encode())
+            if path and os.path.exists(path):
+                with open(path, "rb") as f:
+                    h.update(f.read())
+        _code_digests[key] = h.hexdigest()
+    return _code_digests[key]
+
+
+def strategy_identity(strategy) -> Dict:
+    """Everything about a strategy object that can change its signals"""
+    identity = {
+        "class": f"{type(strategy).__module__}.{type(strategy).__qualname__}",
+        "name": strategy.name,
+        "params": strategy.params,
+    }
+    program = getattr(strategy, "program", None)
+    if program is not None:
+        identity["rules"] = [program.nodes, program.outputs]
+    return identity
+
+
+class DiskCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size = None  # bytes on disk, scanned on first write
+
+    def __repr__(self):
+        return f"DiskCache({self.root!r}, max_bytes={self.max_bytes})"
+
+    def _path(self, kind, key, ext):
+        return os.path.join(self.root, kind, key[:2], f"{key}{ext}")
+
+    def _read(self, path, load):
+        try:
+            with open(path, "rb") as f:
+                value = load(f)
+            os.utime(path)
+        except (FileNotFoundError, ValueError, EOFError):
+            # Missing, evicted by another process, or truncated
+            return None
+        return value
+
+    def _write(self, path, save):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                save(f)
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if self._size is None:
+            self._size = self.stats()["bytes"]
+        else:
+            self._size += os.path.getsize(path) - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def get_json(self, kind, key) -> Optional[Dict]:
+        return self._read(self._path(kind, key, ".json"), json.load)
+
+    def put_json(self, kind, key, value):
+        text = json.dumps(value, default=lambda v: v.item() if isinstance(v, np.generic) else str(v))
+        self._write(self._path(kind, key, ".json"), lambda f: f.write(text.encode()))
+
+    def get_array(self, kind, key) -> Optional[np.ndarray]:
+        return self._read(self._path(kind, key, ".npy"), lambda f: np.load(f, allow_pickle=False))
+
+    def put_array(self, kind, key, values):
+        self._write(self._path(kind, key, ".npy"), lambda f: np.save(f, np.asarray(values), allow_pickle=False))
+
+    def _files(self):
+        """(mtime, size, path) of every cache entry"""
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def stats(self) -> Dict:
+        files = self._files()
+        kinds = {}
+        for _, size, path in files:
+            kind = os.path.relpath(path, self.root).split(os.sep)[0]
+            count, total = kinds.get(kind, (0, 0))
+            kinds[kind] = (count + 1, total + size)
+        return {"files": len(files), "bytes": sum(size for _, size, _ in files), "kinds": kinds}
+
+    def evict(self, max_bytes=None) -> int:
+        """Delete least recently used files until the cache fits max_bytes; returns how many"""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in files:
+            if total <= limit:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self._size = total
+        return removed
+
+    def clear(self, kind=None) -> Dict:
+        """Delete every entry (or every entry of one kind); returns the stats of what was removed"""
+        root = self.root if kind is None else os.path.join(self.root, kind)
+        removed = DiskCache(root).stats()
+        for _, _, path in DiskCache(root)._files():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        for directory, _, _ in sorted(os.walk(root), reverse=True):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+        self._size = None
+        return removed
+
+
+class IndicatorCache:
+    """Per-frame indicator cache for compute_indicators, backed by a DiskCache.
+
+    Keys are indicator specs, as with the plain dict compute_indicators
+    accepts. Arrays are kept in memory and written through to disk under a
+    key that includes the frame's content hash, so they are only reused
+    on identical bars.
+    """
+
+    def __init__(self, df, disk: DiskCache):
+        self.disk = disk
+        self.frame = frame_digest(df)
+        self.code = code_digest("strategies.base", "data.bars")
+        self._memory = {}
+
+    def _key(self, spec):
+        return digest("indicator", self.frame, self.code, list(spec))
+
+    def __contains__(self, spec):
+        if spec in self._memory:
+            return True
+        values = self.disk.get_array("indicators", self._key(spec))
+        if values is not None:
+            self._memory[spec] = values
+        return values is not None
+
+    def __getitem__(self, spec):
+        if spec not in self:
+            raise KeyError(spec)
+        return self._memory[spec]
+
+    def __setitem__(self, spec, values):
+        self._memory[spec] = values
+        self.disk.put_array("indicators", self._key(spec), values)
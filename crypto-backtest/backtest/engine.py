@@ -3,152 +3,648 @@
 Backtest Engine v3 - With position sizing
 """
 
+import heapq
+import itertools
+from array import array
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Callable
 
+from backtest.execution import ExecutionModel, intrabar_exit, intrabar_fills, stop_levels
+from backtest.ledger import Trade, TradeLedger, to_ns  # noqa: F401  (Trade re-exported for callers)
+from backtest.metrics import equity_curve, risk_metrics
+from results.store import ResultsStore, source_key
+from strategies.streaming import StreamState
+
 RESULTS_DIR = "results"
 
-class Trade:
-    def __init__(self, entry_price, entry_time, quantity, coin):
-        self.entry_price = entry_price
-        self.entry_time = entry_time
-        self.quantity = quantity
-        self.coin = coin
-        self.exit_price = None
-        self.exit_time = None
-        self.pnl = 0
-        self.pnl_percent = 0
-        
-    def close(self, exit_price, exit_time):
-        self.exit_price = exit_price
-        self.exit_time = exit_time
-        self.pnl = (exit_price - self.entry_price) * self.quantity
-        self.pnl_percent = ((exit_price - self.entry_price) / self.entry_price) * 100 if self.entry_price > 0 else 0
+
+def coin_slices(data):
+    """Split data into (coin, {column: ndarray}) in first-seen coin order.
+    
+    Each slice holds only that coin's rows as plain typed arrays, which is
+    what gets shipped to worker processes instead of the whole frame.
+    """
+    slices = []
+    for coin, positions in data.groupby("coin", sort=False).indices.items():
+        arrays = {}
+        for col in data.columns:
+            if col == "coin":
+                continue
+            values = data[col].to_numpy()[positions]
+            if values.dtype.kind in "iuf":
+                values = values.astype(np.float64)
+            arrays[col] = values
+        slices.append((coin, arrays))
+    return slices
+
+
+def _coin_frames(data):
+    """(coin, that coin's rows) in first-seen order, from one grouping pass instead of a scan per coin"""
+    for coin, positions in data.groupby("coin", sort=False).indices.items():
+        yield coin, data.iloc[positions]
+
+
+def _timestamps_ns(coin_data):
+    return coin_data["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def _bars(coin_data):
+    """open/high/low/volume arrays of a coin's frame, None for missing columns"""
+    return {
+        col: coin_data[col].to_numpy(dtype=float) if col in coin_data else None
+        for col in ("open", "high", "low", "volume")
+    }
+
+
+def _at(values, idx):
+    return None if values is None else values[idx]
+
+
+def _run_coin_task(task):
+    """Worker entry point: rebuild one coin's frame and backtest it into a TradeLedger"""
+    initial_balance, execution, coin, arrays, position_size, strategy, entry_signal, exit_signal, risk = task
+    engine = BacktestEngine(initial_balance=initial_balance, execution=execution)
+    coin_data = pd.DataFrame(arrays)
+    coin_data["coin"] = coin
+    if strategy is not None:
+        return engine.run_on_coin_signals(coin_data, strategy, coin, position_size)
+    return engine.run_on_coin(coin_data, entry_signal, exit_signal, coin, position_size, risk)
+
+def _next_true(mask) -> np.ndarray:
+    """Per bar, the first index at or after it where mask is set (len(mask) if none)"""
+    n = len(mask)
+    positions = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(positions[::-1])[::-1]
+
+
+def _first_price_exit(closes, highs, lows, lo, hi, entry_price, stop_loss, take_profit, stop, take):
+    """First bar in [lo, hi) whose close pnl or intrabar range hits a stop/target level, else None"""
+    if hi - lo > 32:
+        # Long holds: one whole-slice check
+        price = np.asarray(closes[lo:hi])
+        pnl = ((price - entry_price) / entry_price) * 100
+        hit = np.zeros(hi - lo, dtype=bool)
+        if stop_loss is not None:
+            hit |= pnl < -stop_loss
+        if take_profit is not None:
+            hit |= pnl > take_profit
+        if stop is not None:
+            hit |= np.asarray(lows[lo:hi]) < stop
+        if take is not None:
+            hit |= np.asarray(highs[lo:hi]) > take
+        return lo + int(np.argmax(hit)) if hit.any() else None
+    for j in range(lo, hi):
+        pnl = ((closes[j] - entry_price) / entry_price) * 100
+        if ((stop_loss is not None and pnl < -stop_loss) or (take_profit is not None and pnl > take_profit)
+                or (stop is not None and lows[j] < stop) or (take is not None and highs[j] > take)):
+            return j
+    return None
+
+
+def resolve_positions(close, entry, exit_signal, stop_loss=None, take_profit=None, max_bars=None,
+                      high=None, low=None):
+    """Resolve position state from signal arrays.
+    
+    Mirrors the per-row engine: an exit is checked from the bar after entry
+    (signal, pnl percent below -stop_loss or above take_profit, or max_bars
+    held), and a new entry may open on the same bar a trade closes. A trade
+    still open at the end is closed on the last bar. Given high/low, stop
+    and take-profit levels are also checked intrabar, ahead of the close
+    (see backtest.execution). Returns a list of (entry_idx, exit_idx,
+    exit_reason) tuples.
+    
+    The next entry and next exit signal from every bar are precomputed with
+    a reverse cumulative minimum, so each trade jumps straight to its entry
+    and to the latest bar it can be held to. Only stop/target levels, which
+    depend on the entry price, are scanned, and only up to that bar.
+    """
+    n = len(close)
+    if n == 0:
+        return []
+    next_entry = _next_true(np.asarray(entry, dtype=bool) & (close > 0)).tolist()
+    exit_signal = np.asarray(exit_signal, dtype=bool)
+    next_exit = _next_true(exit_signal).tolist() + [n]
+    closes = close.tolist()
+    highs = high.tolist() if high is not None else None
+    lows = low.tolist() if low is not None else None
+    price_exits = stop_loss is not None or take_profit is not None
+    risk = {"stop_loss": stop_loss, "take_profit": take_profit, "max_bars": max_bars}
+    spans = []
+    start = 0
+    while start < n:
+        entry_idx = next_entry[start]
+        if entry_idx >= n:
+            break
+        entry_price = closes[entry_idx]
+        # Latest bar the trade can be held to: next exit signal or max_bars, whichever comes first
+        limit = next_exit[entry_idx + 1]
+        if max_bars is not None:
+            limit = min(limit, entry_idx + max_bars)
+        exit_idx = None
+        if price_exits:
+            stop, take = stop_levels(entry_price, risk) if low is not None else (None, None)
+            exit_idx = _first_price_exit(closes, highs, lows, entry_idx + 1, min(limit + 1, n), entry_price,
+                                         stop_loss, take_profit, stop, take)
+        if exit_idx is None:
+            if limit >= n:
+                spans.append((entry_idx, n - 1, "end"))
+                break
+            exit_idx = limit
+        position = {"entry_price": entry_price, "entry_idx": entry_idx}
+        reason = None
+        if low is not None:
+            reason = (intrabar_exit(risk, entry_price, None, highs[exit_idx], lows[exit_idx]) or (None,))[0]
+        reason = reason or _exit_reason(risk, exit_signal[exit_idx], exit_idx, position, closes[exit_idx])
+        spans.append((entry_idx, exit_idx, reason))
+        start = exit_idx
+    return spans
+
+
+def _exit_reason(risk, exit_signal, idx, position, price):
+    """Same exit rules as Strategy.exit_condition, given risk() and the bar's exit signal; None to hold"""
+    entry_price = position["entry_price"]
+    pnl = ((price - entry_price) / entry_price) * 100
+    if risk["stop_loss"] is not None and pnl < -risk["stop_loss"]:
+        return "stop_loss"
+    if risk["take_profit"] is not None and pnl > risk["take_profit"]:
+        return "take_profit"
+    if risk["max_bars"] is not None and idx - position["entry_idx"] >= risk["max_bars"]:
+        return "max_bars"
+    return "signal" if exit_signal else None
+
+
+def _intrabar(execution, risk, position, bars, idx):
+    """intrabar_exit() on bar idx, when the model checks stops intrabar and the bars have a range"""
+    if not execution.intrabar or risk is None or bars["high"] is None or bars["low"] is None:
+        return None
+    return intrabar_exit(risk, position["entry_price"], _at(bars["open"], idx), bars["high"][idx], bars["low"][idx])
+
+
+def _open(execution, price, stake, entry_idx, entry_time, volume=None):
+    """Position opened with stake at the bar close price, filled by the execution model.
+    
+    entry_price stays the bar close, which exit rules and stop levels are
+    measured from; the ledger records entry_fill.
+    """
+    fill, quantity, fee = execution.buy(price, stake, volume)
+    return {
+        "entry_price": price,
+        "entry_fill": fill,
+        "entry_time": entry_time,
+        "entry_idx": entry_idx,
+        "quantity": quantity,
+        "fee": fee,
+    }
+
+
+def _close(ledger, execution, coin, position, exit_price, exit_idx, exit_time, reason, volume=None):
+    """Fill and record a closed position in ledger; returns (pnl, sale proceeds net of fee)"""
+    quantity = position["quantity"]
+    fill, fee = execution.sell(exit_price, quantity, volume)
+    fees = position["fee"] + fee
+    ledger.append(coin, position["entry_fill"], fill, quantity, position["entry_idx"], exit_idx,
+                  position.get("entry_time"), exit_time, fees, reason)
+    return (fill - position["entry_fill"]) * quantity - fees, quantity * fill - fee
+
 
 class BacktestEngine:
-    def __init__(self, initial_balance=1000):
+    def __init__(self, initial_balance=1000, execution=None):
         self.initial_balance = initial_balance
+        self.execution = execution or ExecutionModel()
         self.balance = initial_balance
-        self.trades: List[Trade] = []
-        self.open_positions: Dict[str, Trade] = {}
+        self.ledger = TradeLedger()
+        self.prices: Dict[str, tuple] = {}
+        self.open_positions: Dict[str, Dict] = {}
+        self._equity = None
+    
+    @property
+    def trades(self) -> List[Dict]:
+        """Closed trades as dicts, materialized from the ledger"""
+        return self.ledger.records()
         
     def reset(self):
         self.balance = self.initial_balance
-        self.trades = []
+        self.ledger = TradeLedger()
+        self.prices = {}
         self.open_positions = {}
+        self._equity = None
+    
+    def _track(self, coin, timestamps, close):
+        """Remember a coin's bars (ns timestamps, closes) for the equity curve"""
+        self.prices[coin] = (timestamps, close)
+        self._equity = None
         
-    def run_on_coin(self, df, entry_signal, exit_signal, coin, position_size=1.0):
-        """Run backtest for a single coin"""
-        coin_data = df[df["coin"] == coin].reset_index(drop=True)
+    def run_on_coin(self, coin_data, entry_signal, exit_signal, coin, position_size=1.0, risk=None):
+        """Run backtest for a single coin's frame (only that coin's rows).
+        
+        Callbacks are called as entry_signal(coin_data, idx) and
+        exit_signal(coin_data, idx, position), where idx is the bar position
+        within this coin's frame and position["entry_idx"] is the bar the
+        open trade was entered on. exit_signal may return an exit reason
+        (see backtest.ledger.EXIT_REASONS) instead of True. Given the
+        strategy's risk(), an intrabar execution model checks its stop and
+        take-profit levels before exit_signal is called. Returns the coin's
+        trades as a TradeLedger.
+        """
+        coin_trades = TradeLedger()
+        coin_data = coin_data.reset_index(drop=True)
         if len(coin_data) < 10:
-            return []
+            return coin_trades
         
+        close = coin_data["close"].to_numpy(dtype=float)
+        timestamps = coin_data["timestamp"].to_numpy()
+        bars = _bars(coin_data)
+        volume = bars["volume"]
+        self._track(coin, _timestamps_ns(coin_data), close)
         coin_balance = self.initial_balance * position_size
-        coin_trades = []
         position = None
         
         for idx in range(len(coin_data)):
-            row = coin_data.iloc[idx]
-            current_price = row["close"]
+            current_price = close[idx]
             
             if position is not None:
-                if exit_signal(row, position):
-                    pnl = (current_price - position["entry_price"]) * position["quantity"]
-                    coin_balance += pnl
-                    coin_trades.append({
-                        "coin": coin,
-                        "entry": position["entry_price"],
-                        "exit": current_price,
-                        "pnl": pnl,
-                        "pnl_pct": ((current_price - position["entry_price"]) / position["entry_price"]) * 100 if position["entry_price"] > 0 else 0
-                    })
+                hit = _intrabar(self.execution, risk, position, bars, idx)
+                if hit:
+                    reason, price = hit
+                else:
+                    reason, price = exit_signal(coin_data, idx, position), current_price
+                if reason:
+                    reason = reason if isinstance(reason, str) else "signal"
+                    coin_balance += _close(coin_trades, self.execution, coin, position, price, idx, timestamps[idx],
+                                           reason, _at(volume, idx))[0]
                     position = None
             
             if position is None:
-                if entry_signal(row):
+                if entry_signal(coin_data, idx):
                     if current_price > 0:
-                        position = {
-                            "entry_price": current_price,
-                            "entry_time": row["timestamp"],
-                            "quantity": coin_balance / current_price
-                        }
+                        position = _open(self.execution, current_price, coin_balance, idx, timestamps[idx],
+                                         _at(volume, idx))
         
         if position is not None:
-            last_row = coin_data.iloc[-1]
-            pnl = (last_row["close"] - position["entry_price"]) * position["quantity"]
-            coin_trades.append({
+            last = len(close) - 1
+            _close(coin_trades, self.execution, coin, position, close[last], last, timestamps[last], "end",
+                   _at(volume, last))
+        
+        return coin_trades
+    
+    def run_on_coin_signals(self, coin_data, strategy, coin, position_size=1.0):
+        """Vectorized counterpart of run_on_coin driven by strategy.signals(); coin_data holds only coin's rows"""
+        coin_data = coin_data.reset_index(drop=True)
+        if len(coin_data) < 10:
+            return TradeLedger()
+        
+        return self.trades_from_signals(coin_data, strategy.signals(coin_data), coin, position_size)
+    
+    def trades_from_signals(self, coin_data, signals, coin, position_size=1.0):
+        """TradeLedger for one coin's frame from precomputed strategy.signals()"""
+        close = coin_data["close"].to_numpy(dtype=float)
+        timestamps = _timestamps_ns(coin_data)
+        self._track(coin, timestamps, close)
+        bars = _bars(coin_data)
+        risk = {key: signals[key] for key in ("stop_loss", "take_profit", "max_bars")}
+        intrabar = self.execution.intrabar and bars["high"] is not None and bars["low"] is not None
+        spans = resolve_positions(close, signals["entry"], signals["exit"], risk["stop_loss"], risk["take_profit"],
+                                  risk["max_bars"], high=bars["high"] if intrabar else None,
+                                  low=bars["low"] if intrabar else None)
+        
+        coin_trades = TradeLedger(capacity=max(1, len(spans)))
+        if not spans:
+            return coin_trades
+        entry_idx, exit_idx, reasons = zip(*spans)
+        entry_idx, exit_idx = np.array(entry_idx), np.array(exit_idx)
+        entry_price, exit_price = close[entry_idx], close[exit_idx]
+        if intrabar:
+            triggered = np.isin(reasons, ("stop_loss", "take_profit"))
+            exit_price = np.where(triggered, intrabar_fills(risk, entry_price, exit_price, _at(bars["open"], exit_idx),
+                                                            bars["high"][exit_idx], bars["low"][exit_idx]), exit_price)
+        volume = bars["volume"]
+        entry_fill, exit_fill, quantity, fees = self.execution.fill_trades(
+            entry_price, exit_price, self.initial_balance * position_size,
+            _at(volume, entry_idx), _at(volume, exit_idx))
+        coin_trades.append_many(coin, entry_fill, exit_fill, quantity, entry_idx, exit_idx,
+                                timestamps[entry_idx], timestamps[exit_idx], fees, reasons)
+        return coin_trades
+    
+    def run_portfolio(self, data, strategy, max_positions=5, position_size=None):
+        """Backtest all coins against one shared cash balance.
+        
+        Each coin's bars become a time-ordered stream and the streams are
+        k-way merged with a heap, so the cost is linear in total bars (times
+        log of the coin count) with no sort of the whole frame. At each
+        timestamp exits are processed before entries, so freed cash and
+        slots are available to coins entering on the same bar. A new
+        position stakes position_size of current equity at cost (cash plus
+        open positions at entry value), capped by available cash, and no
+        more than max_positions are held at once. Fees are paid out of
+        the stake.
+        """
+        self.reset()
+        if position_size is None:
+            position_size = strategy.get_position_size()
+        
+        coins = []
+        for coin, positions in data.groupby("coin", sort=False).indices.items():
+            if len(positions) < 10:
+                continue
+            coin_data = data.iloc[positions].reset_index(drop=True)
+            self._track(coin, _timestamps_ns(coin_data), coin_data["close"].to_numpy(dtype=float))
+            coins.append({
                 "coin": coin,
-                "entry": position["entry_price"],
-                "exit": last_row["close"],
-                "pnl": pnl,
-                "pnl_pct": ((last_row["close"] - position["entry_price"]) / position["entry_price"]) * 100 if position["entry_price"] > 0 else 0
+                "close": coin_data["close"].to_numpy(dtype=float),
+                "timestamp": _timestamps_ns(coin_data),
+                "signals": strategy.signals(coin_data),
+                **_bars(coin_data),
             })
         
-        return coin_trades
+        streams = [
+            zip(c["timestamp"], itertools.repeat(k), range(len(c["close"])))
+            for k, c in enumerate(coins)
+        ]
+        cash = self.initial_balance
+        invested = 0.0
+        
+        for _, events in itertools.groupby(heapq.merge(*streams), key=lambda e: e[0]):
+            events = list(events)
+            for _, k, idx in events:
+                position = self.open_positions.get(k)
+                if position is None or position["entry_idx"] == idx:
+                    continue
+                price = coins[k]["close"][idx]
+                signals = coins[k]["signals"]
+                hit = _intrabar(self.execution, signals, position, coins[k], idx)
+                if hit:
+                    reason, price = hit
+                else:
+                    reason = _exit_reason(signals, signals["exit"][idx], idx, position, price)
+                if reason:
+                    cash += _close(self.ledger, self.execution, coins[k]["coin"], position, price, idx,
+                                   coins[k]["timestamp"][idx], reason, _at(coins[k]["volume"], idx))[1]
+                    invested -= position["cost"]
+                    del self.open_positions[k]
+            for _, k, idx in events:
+                if k in self.open_positions or len(self.open_positions) >= max_positions:
+                    continue
+                price = coins[k]["close"][idx]
+                if not coins[k]["signals"]["entry"][idx] or not price > 0:
+                    continue
+                stake = min(cash, (cash + invested) * position_size)
+                if stake <= 0:
+                    continue
+                cash -= stake
+                invested += stake
+                self.open_positions[k] = _open(self.execution, price, stake, idx, coins[k]["timestamp"][idx],
+                                               _at(coins[k]["volume"], idx))
+                self.open_positions[k]["cost"] = stake
+        
+        for k, position in self.open_positions.items():
+            last = len(coins[k]["close"]) - 1
+            _close(self.ledger, self.execution, coins[k]["coin"], position, coins[k]["close"][last], last,
+                   coins[k]["timestamp"][last], "end", _at(coins[k]["volume"], last))
+        self.open_positions = {}
+        
+        return self.get_metrics()
     
-    def run(self, data, entry_signal: Callable, exit_signal: Callable, position_size=1.0):
+    def run_cross_section(self, panel, strategy, position_size=None):
+        """Backtest a cross-sectional strategy on a data.panel.Panel from one shared balance.
+        
+        strategy.targets(panel) gives the holdings per bar for the whole
+        universe at once, and the loop visits only the bars where they
+        change. There, coins leaving the target are sold first, at their
+        last close if they have no bar that row. Then coins entering are
+        bought with position_size of current equity each (capped by cash),
+        provided they have a bar. A targeted coin left unbought for lack of
+        a bar is retried on its next bar while it stays targeted and there
+        is cash; one left unbought for lack of cash is retried when a sale
+        frees some. Positions still open at the end close on each coin's
+        last bar. Trade bar indices count each coin's own bars, as in the
+        per-coin paths.
+        """
         self.reset()
+        if position_size is None:
+            position_size = strategy.get_position_size()
+        
+        targets = strategy.targets(panel)
+        last = panel.ffill("close")
+        bar_index = panel.bar_index()
+        coins = [panel.coin(c) for c in range(len(panel.coins))]
+        for c, coin in enumerate(panel.coins):
+            if len(coins[c]["close"]):
+                self._track(coin, coins[c]["timestamp"], coins[c]["close"])
         
-        all_trades = []
-        coins = data["coin"].unique()
+        cash = self.initial_balance
+        held = np.zeros(len(panel.coins), dtype=bool)
+        changed = np.flatnonzero((targets != np.vstack([held, targets[:-1]])).any(axis=1))
+        # Per cell, the first row at or after it where the coin has a bar (len(panel) if none)
+        next_bar = np.where(panel.valid, np.arange(len(panel))[:, None], len(panel))
+        next_bar = np.minimum.accumulate(next_bar[::-1], axis=0)[::-1]
+        row = changed[0] if len(changed) else len(panel)
+        while row < len(panel):
+            for c in np.flatnonzero(held & ~targets[row]):
+                idx = bar_index[row, c]
+                cash += _close(self.ledger, self.execution, panel.coins[c], self.open_positions.pop(c), last[row, c],
+                               idx, coins[c]["timestamp"][idx], "signal", _at(coins[c].get("volume"), idx))[1]
+                held[c] = False
+            entering = np.flatnonzero(targets[row] & ~held & panel.valid[row])
+            if len(entering):
+                open_coins = np.flatnonzero(held)
+                quantities = np.array([self.open_positions[c]["quantity"] for c in open_coins])
+                equity = cash + float(np.dot(quantities, last[row, open_coins]))
+                for c in entering:
+                    stake = min(cash, equity * position_size)
+                    if stake <= 0:
+                        break
+                    idx = bar_index[row, c]
+                    self.open_positions[c] = _open(self.execution, last[row, c], stake, idx, coins[c]["timestamp"][idx],
+                                                   _at(coins[c].get("volume"), idx))
+                    cash -= stake
+                    held[c] = True
+            # Next change of targets, or sooner the next bar of a target still unbought while cash remains
+            following = np.searchsorted(changed, row, side="right")
+            next_row = changed[following] if following < len(changed) else len(panel)
+            waiting = np.flatnonzero(targets[row] & ~held)
+            if len(waiting) and cash > 0 and row + 1 < len(panel):
+                next_row = min(next_row, next_bar[row + 1, waiting].min())
+            row = next_row
         
-        for coin in coins:
-            coin_trades = self.run_on_coin(data, entry_signal, exit_signal, coin, position_size)
-            all_trades.extend(coin_trades)
+        for c, position in self.open_positions.items():
+            idx = len(coins[c]["close"]) - 1
+            _close(self.ledger, self.execution, panel.coins[c], position, coins[c]["close"][idx], idx,
+                   coins[c]["timestamp"][idx], "end", _at(coins[c].get("volume"), idx))
+        self.open_positions = {}
         
-        self.trades = all_trades
         return self.get_metrics()
     
-    def get_metrics(self) -> Dict:
-        if not self.trades:
-            return {
-                "total_trades": 0,
-                "profitable": 0,
-                "losing": 0,
-                "win_rate": 0,
-                "total_pnl": 0,
-                "avg_profit": 0,
-                "avg_loss": 0,
-                "max_profit": 0,
-                "max_loss": 0,
-            }
-        
-        pnls = [t["pnl"] for t in self.trades]
-        profits = [t for t in pnls if t > 0]
-        losses = [t for t in pnls if t < 0]
-        
-        return {
-            "total_trades": len(self.trades),
-            "profitable": len(profits),
-            "losing": len(losses),
-            "win_rate": (len(profits) / len(self.trades)) * 100 if self.trades else 0,
-            "total_pnl": sum(pnls),
-            "avg_profit": np.mean(profits) if profits else 0,
-            "avg_loss": np.mean(losses) if losses else 0,
-            "max_profit": max(profits) if profits else 0,
-            "max_loss": min(losses) if losses else 0,
-            "final_balance": self.initial_balance + sum(pnls),
-            "return_pct": (sum(pnls) / self.initial_balance) * 100,
-            "trades": self.trades
-        }
+    def run_stream(self, bars, strategy, position_size=None):
+        """Backtest a feed of bars consumed one at a time.
+        
+        bars is any iterable of mappings with coin, timestamp and price
+        columns, e.g. a file replay or a live feed, in time order per coin.
+        Indicators are updated incrementally (strategies.streaming), so each
+        bar costs O(1) and memory is bounded by the longest window. Signals
+        match the batch path; coins are not skipped for being short, since
+        their length is unknown up front. Trades are recorded as they close,
+        and each coin's closes are kept in compact arrays for the equity curve.
+        """
+        self.reset()
+        if position_size is None:
+            position_size = strategy.get_position_size()
+        specs = strategy.indicators()
+        risk = strategy.risk()
+        
+        states = {}
+        for bar in bars:
+            coin = bar["coin"]
+            state = states.get(coin)
+            if state is None:
+                state = states[coin] = {
+                    "stream": StreamState(specs),
+                    "balance": self.initial_balance * position_size,
+                    "price": None,
+                    "timestamp": None,
+                    "volume": None,
+                    "closes": array("d"),
+                    "timestamps": array("q"),
+                }
+            cols = state["stream"].update(bar)
+            idx = state["stream"].bar
+            price = cols["close"][0]
+            state["price"] = price
+            state["timestamp"] = to_ns(bar.get("timestamp"))
+            state["closes"].append(price)
+            state["timestamps"].append(state["timestamp"])
+            
+            volume = state["volume"] = bar.get("volume")
+            
+            position = self.open_positions.get(coin)
+            if position is not None:
+                hit = None
+                if self.execution.intrabar and bar.get("high") is not None and bar.get("low") is not None:
+                    hit = intrabar_exit(risk, position["entry_price"], bar.get("open"), bar["high"], bar["low"])
+                if hit:
+                    reason, exit_price = hit
+                else:
+                    reason = _exit_reason(risk, strategy.exit_rule(cols)[0], idx, position, price)
+                    exit_price = price
+                if reason:
+                    state["balance"] += _close(self.ledger, self.execution, coin, position, exit_price, idx,
+                                               state["timestamp"], reason, volume)[0]
+                    del self.open_positions[coin]
+                    position = None
+            
+            if position is None and price > 0:
+                if (strategy.filter_mask(cols) & strategy.entry_rule(cols))[0]:
+                    self.open_positions[coin] = _open(self.execution, price, state["balance"], idx,
+                                                      state["timestamp"], volume)
+        
+        for coin, position in self.open_positions.items():
+            state = states[coin]
+            _close(self.ledger, self.execution, coin, position, state["price"], state["stream"].bar,
+                   state["timestamp"], "end", state["volume"])
+        self.open_positions = {}
+        for coin, state in states.items():
+            self._track(coin, np.frombuffer(state["timestamps"], dtype=np.int64),
+                        np.frombuffer(state["closes"], dtype=np.float64))
+        
+        return self.get_metrics()
     
-    def save_results(self, strategy_name, data_params):
-        import json
-        import os
-        os.makedirs(RESULTS_DIR, exist_ok=True)
+    def run_signals(self, data, strategy, position_size=None, workers=None):
+        """Backtest every coin from the strategy's signal arrays instead of per-row callbacks"""
+        self.reset()
+        if position_size is None:
+            position_size = strategy.get_position_size()
+        
+        if workers and workers > 1:
+            self.ledger = self.run_parallel(data, position_size, workers, strategy=strategy)
+            return self.get_metrics()
+        
+        for coin, coin_data in _coin_frames(data):
+            self.ledger.extend(self.run_on_coin_signals(coin_data, strategy, coin, position_size))
+        
+        return self.get_metrics()
+    
+    def run_parallel(self, data, position_size, workers, strategy=None, entry_signal=None, exit_signal=None,
+                     risk=None):
+        """Shard coins across a process pool and merge their ledgers in coin order.
+        
+        Pass a strategy for the signal path, or picklable entry/exit callbacks
+        (e.g. bound strategy methods, not lambdas) for the row path.
+        """
+        slices = coin_slices(data)
+        tasks = [
+            (self.initial_balance, self.execution, coin, arrays, position_size, strategy, entry_signal, exit_signal,
+             risk)
+            for coin, arrays in slices
+        ]
+        for coin, arrays in slices:
+            if len(arrays["close"]) >= 10:
+                self._track(coin, arrays["timestamp"].astype("datetime64[ns]").view(np.int64), arrays["close"])
+        ledger = TradeLedger()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            # map() yields in submission order, so the merge is deterministic
+            for coin_trades in pool.map(_run_coin_task, tasks, chunksize=chunksize):
+                ledger.extend(coin_trades)
+        return ledger
+    
+    def run(self, data, entry_signal: Callable, exit_signal: Callable, position_size=1.0, workers=None, risk=None):
+        self.reset()
+        
+        if workers and workers > 1:
+            self.ledger = self.run_parallel(data, position_size, workers,
+                                            entry_signal=entry_signal, exit_signal=exit_signal, risk=risk)
+            return self.get_metrics()
+        
+        for coin, coin_data in _coin_frames(data):
+            coin_trades = self.run_on_coin(coin_data, entry_signal, exit_signal, coin, position_size, risk)
+            self.ledger.extend(coin_trades)
         
+        return self.get_metrics()
+    
+    def equity_curve(self):
+        """(timestamps_ns, equity, in_market) per bar of the last run, see backtest.metrics"""
+        if self._equity is None or self._equity[0] != self.ledger.version:
+            curve = equity_curve(self.ledger, self.prices, self.initial_balance)
+            risk = risk_metrics(*curve, self.ledger.column("pnl"))
+            self._equity = (self.ledger.version, curve, risk)
+        return self._equity[1]
+    
+    def get_metrics(self, include_trades=True) -> Dict:
+        """Trade and equity-curve metrics (cached until the ledger changes), plus the trade list if asked"""
+        self.equity_curve()
+        metrics = {**self.ledger.metrics(self.initial_balance), **self._equity[2]}
+        if include_trades and len(self.ledger):
+            metrics["trades"] = self.trades
+        return metrics
+    
+    def save_results(self, strategy_name, data_params):
         metrics = self.get_metrics()
-        result = {
-            "strategy": strategy_name,
-            "params": data_params,
-            "timestamp": datetime.now().isoformat(),
-            "metrics": metrics
-        }
-        
-        filename = f"{RESULTS_DIR}/{strategy_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, "w") as f:
-            json.dump(result, f, indent=2)
-        
-        return filename, metrics
+        return save_result(strategy_name, data_params, metrics), metrics
+
+
+def save_result(strategy_name, params, metrics) -> str:
+    """Write a result JSON to RESULTS_DIR and index it in results.db; returns the file name"""
+    import json
+    import os
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    
+    result = {
+        "strategy": strategy_name,
+        "params": params,
+        "timestamp": datetime.now().isoformat(),
+        "metrics": metrics
+    }
+    
+    filename = f"{RESULTS_DIR}/{strategy_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w") as f:
+        json.dump(result, f, indent=2)
+    
+    store = ResultsStore(os.path.join(RESULTS_DIR, "results.db"))
+    try:
+        store.add(result, source=source_key(filename))
+    finally:
+        store.close()
+    
+    return filename
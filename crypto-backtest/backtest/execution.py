@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Execution Model - Fill prices and costs: fees, slippage and intrabar stops
+
+The engine decides when a position opens and closes; an ExecutionModel
+decides at what price and cost. Orders fill at the bar close moved
+against the trade by slippage: slippage_pct plus an impact term that
+grows with the order's share of the bar's volume (volume is in quote
+currency, as fetched). Every fill pays fee_pct of its notional plus
+fee_fixed, capped at the notional. An entry stakes its fee, so the
+quantity bought is (stake - fee) / fill price.
+
+With intrabar=True, stop-loss and take-profit levels (the risk()
+percents from the entry bar's close) are checked against each bar's low
+and high instead of its close. They fill at the level, or at the open
+when the bar gapped through it. If both levels trade within one bar the
+stop is assumed to have come first. Frames without high/low columns
+keep the close checks.
+
+The default model has no costs and no intrabar checks: every fill is at
+the bar close, exactly as before.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DEFAULTS = {"fee_pct": 0.0, "fee_fixed": 0.0, "slippage_pct": 0.0, "impact": 0.0, "intrabar": False}
+
+
+def stop_levels(entry_price, risk) -> Tuple[Optional[float], Optional[float]]:
+    """(stop-loss price, take-profit price) for a position entered at entry_price; None where disabled"""
+    stop = take = None
+    if risk.get("stop_loss") is not None:
+        stop = entry_price * (1 - risk["stop_loss"] / 100)
+    if risk.get("take_profit") is not None:
+        take = entry_price * (1 + risk["take_profit"] / 100)
+    return stop, take
+
+
+def intrabar_exit(risk, entry_price, bar_open, high, low) -> Optional[Tuple[str, float]]:
+    """(exit reason, trigger price) if a stop-loss or take-profit traded within the bar, else None"""
+    stop, take = stop_levels(entry_price, risk)
+    if stop is not None and low < stop:
+        return "stop_loss", bar_open if bar_open is not None and bar_open < stop else stop
+    if take is not None and high > take:
+        return "take_profit", bar_open if bar_open is not None and bar_open > take else take
+    return None
+
+
+class ExecutionModel:
+    def __init__(self, fee_pct=0.0, fee_fixed=0.0, slippage_pct=0.0, impact=0.0, intrabar=False):
+        """fee_pct/slippage_pct in percent; impact is slippage percent per unit of bar-volume participation"""
+        self.fee_pct = fee_pct
+        self.fee_fixed = fee_fixed
+        self.slippage_pct = slippage_pct
+        self.impact = impact
+        self.intrabar = intrabar
+
+    def __repr__(self):
+        settings = ", ".join(f"{k}={v}" for k, v in self.params().items())
+        return f"ExecutionModel({settings})"
+
+    def params(self) -> Dict:
+        """Settings that differ from the default (close fills, no costs)"""
+        return {k: getattr(self, k) for k, default in DEFAULTS.items() if getattr(self, k) != default}
+
+    def slippage(self, notional, volume=None) -> float:
+        """Slippage in percent of price for an order of notional value on a bar of volume"""
+        slip = self.slippage_pct
+        if self.impact and volume is not None and volume > 0:
+            slip += self.impact * notional / volume
+        return min(slip, 100.0)
+
+    def fee(self, notional) -> float:
+        return min(notional, notional * self.fee_pct / 100 + self.fee_fixed)
+
+    def buy(self, price, stake, volume=None) -> Tuple[float, float, float]:
+        """Fill a buy of stake (quote currency, fee included); returns (fill price, quantity, fee)"""
+        fill = price * (1 + self.slippage(stake, volume) / 100)
+        fee = self.fee(stake)
+        return fill, (stake - fee) / fill, fee
+
+    def sell(self, price, quantity, volume=None) -> Tuple[float, float]:
+        """Fill a sale of quantity; returns (fill price, fee)"""
+        fill = price * (1 - self.slippage(quantity * price, volume) / 100)
+        return fill, self.fee(quantity * fill)
+
+    def fill_trades(self, entry_price, exit_price, balance, entry_volume=None, exit_volume=None):
+        """Fill a coin's trades in order, each staking the balance left by the previous ones.
+        
+        Takes arrays of entry/exit bar prices (and volumes); returns arrays
+        (entry fill, exit fill, quantity, fees).
+        """
+        n = len(entry_price)
+        entry_fill, exit_fill = entry_price.copy(), exit_price.copy()
+        quantity, fees = np.empty(n), np.zeros(n)
+        if not self.params():
+            for k in range(n):
+                quantity[k] = balance / entry_price[k]
+                balance += (exit_price[k] - entry_price[k]) * quantity[k]
+            return entry_fill, exit_fill, quantity, fees
+        if entry_volume is None:
+            entry_volume = exit_volume = np.full(n, np.nan)
+        for k in range(n):
+            entry_fill[k], quantity[k], fee = self.buy(entry_price[k], balance, entry_volume[k])
+            exit_fill[k], exit_fee = self.sell(exit_price[k], quantity[k], exit_volume[k])
+            fees[k] = fee + exit_fee
+            balance += (exit_fill[k] - entry_fill[k]) * quantity[k] - fees[k]
+        return entry_fill, exit_fill, quantity, fees
+
+
+def intrabar_fills(risk, entry_price, exit_price, bar_open, high, low) -> np.ndarray:
+    """Vectorized intrabar_exit() over exit bars: trigger price where a level traded, else exit_price"""
+    stop, take = stop_levels(entry_price, risk)
+    prices = exit_price.copy()
+    stopped = np.zeros(len(prices), dtype=bool)
+    if stop is not None:
+        stopped = low < stop
+        fill = stop if bar_open is None else np.where(bar_open < stop, bar_open, stop)
+        prices = np.where(stopped, fill, prices)
+    if take is not None:
+        taken = ~stopped & (high > take)
+        fill = take if bar_open is None else np.where(bar_open > take, bar_open, take)
+        prices = np.where(taken, fill, prices)
+    return prices
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Trade Ledger - Compact columnar storage for closed trades
+
+Trades live in one growable NumPy structured array (77 bytes per
+trade) instead of a dict per trade. Metrics are computed from its columns
+and cached until the next append.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+EXIT_REASONS = ("signal", "stop_loss", "take_profit", "max_bars", "end")
+NAT = np.iinfo(np.int64).min
+
+TRADE_DTYPE = np.dtype([
+    ("coin", np.int32),
+    ("entry_idx", np.int32),
+    ("exit_idx", np.int32),
+    ("exit_reason", np.uint8),
+    ("entry_time", np.int64),  # ns since epoch, NAT if unknown
+    ("exit_time", np.int64),
+    ("entry_price", np.float64),
+    ("exit_price", np.float64),
+    ("quantity", np.float64),
+    ("fees", np.float64),
+    ("pnl", np.float64),
+    ("pnl_pct", np.float64),
+])
+
+
+def to_ns(timestamp) -> int:
+    """Timestamp-like (or None) as int64 nanoseconds"""
+    if timestamp is None:
+        return NAT
+    if isinstance(timestamp, (int, np.integer)):
+        return int(timestamp)
+    value = pd.Timestamp(timestamp)
+    return NAT if value is pd.NaT else value.value
+
+
+class Trade:
+    """One trade, e.g. a row read back from a TradeLedger"""
+
+    __slots__ = ("entry_price", "entry_time", "entry_idx", "quantity", "coin",
+                 "exit_price", "exit_time", "exit_idx", "exit_reason", "fees", "pnl", "pnl_percent")
+
+    def __init__(self, entry_price, entry_time, quantity, coin, entry_idx=None):
+        self.entry_price = entry_price
+        self.entry_time = entry_time
+        self.entry_idx = entry_idx
+        self.quantity = quantity
+        self.coin = coin
+        self.exit_price = None
+        self.exit_time = None
+        self.exit_idx = None
+        self.exit_reason = None
+        self.fees = 0
+        self.pnl = 0
+        self.pnl_percent = 0
+
+    def close(self, exit_price, exit_time, exit_idx=None, exit_reason="signal", fees=0):
+        self.exit_price = exit_price
+        self.exit_time = exit_time
+        self.exit_idx = exit_idx
+        self.exit_reason = exit_reason
+        self.fees = fees
+        self.pnl = (exit_price - self.entry_price) * self.quantity - fees
+        self.pnl_percent = ((exit_price - self.entry_price) / self.entry_price) * 100 if self.entry_price > 0 else 0
+
+
+class TradeLedger:
+    def __init__(self, capacity=64):
+        self._data = np.zeros(capacity, dtype=TRADE_DTYPE)
+        self._size = 0
+        self.coins: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.version = 0
+        self._cache = {}
+
+    def __len__(self):
+        return self._size
+
+    def __getstate__(self):
+        # Ship only the filled rows between processes
+        state = self.__dict__.copy()
+        state["_data"] = self._data[:self._size].copy()
+        state["_cache"] = {}
+        return state
+
+    def _code(self, coin) -> int:
+        code = self._codes.get(coin)
+        if code is None:
+            code = self._codes[coin] = len(self.coins)
+            self.coins.append(coin)
+        return code
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed > len(self._data):
+            grown = np.zeros(max(needed, 2 * len(self._data)), dtype=TRADE_DTYPE)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+    def append(self, coin, entry_price, exit_price, quantity, entry_idx=-1, exit_idx=-1,
+               entry_time=None, exit_time=None, fees=0.0, exit_reason="signal"):
+        self._reserve(1)
+        pnl = (exit_price - entry_price) * quantity - fees
+        pnl_pct = ((exit_price - entry_price) / entry_price) * 100 if entry_price > 0 else 0
+        self._data[self._size] = (
+            self._code(coin), entry_idx, exit_idx, EXIT_REASONS.index(exit_reason),
+            to_ns(entry_time), to_ns(exit_time), entry_price, exit_price, quantity, fees, pnl, pnl_pct,
+        )
+        self._size += 1
+        self.version += 1
+
+    def append_many(self, coin, entry_price, exit_price, quantity, entry_idx, exit_idx,
+                    entry_time, exit_time, fees, exit_reason):
+        """Append one coin's trades from equal-length arrays (times as int64 ns, reasons as strings)"""
+        n = len(entry_price)
+        if not n:
+            return
+        self._reserve(n)
+        rows = self._data[self._size:self._size + n]
+        rows["coin"] = self._code(coin)
+        rows["entry_idx"] = entry_idx
+        rows["exit_idx"] = exit_idx
+        rows["exit_reason"] = [EXIT_REASONS.index(reason) for reason in exit_reason]
+        rows["entry_time"] = entry_time
+        rows["exit_time"] = exit_time
+        rows["entry_price"] = entry_price
+        rows["exit_price"] = exit_price
+        rows["quantity"] = quantity
+        rows["fees"] = fees
+        rows["pnl"] = (rows["exit_price"] - rows["entry_price"]) * rows["quantity"] - rows["fees"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pnl_pct = ((rows["exit_price"] - rows["entry_price"]) / rows["entry_price"]) * 100
+        rows["pnl_pct"] = np.where(rows["entry_price"] > 0, pnl_pct, 0)
+        self._size += n
+        self.version += 1
+
+    def extend(self, other: "TradeLedger"):
+        """Append all of other's trades, in order"""
+        if not len(other):
+            return
+        rows = other._data[:other._size].copy()
+        remap = np.array([self._code(coin) for coin in other.coins], dtype=np.int32)
+        rows["coin"] = remap[rows["coin"]]
+        self._reserve(len(rows))
+        self._data[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+        self.version += 1
+
+    def offset(self, bars):
+        """Shift every trade's entry/exit bar by bars, e.g. from a window to its full history"""
+        self._data["entry_idx"][:self._size] += bars
+        self._data["exit_idx"][:self._size] += bars
+        self.version += 1
+
+    def column(self, name) -> np.ndarray:
+        """Read-only view of one column over the filled rows"""
+        view = self._data[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def __getitem__(self, i) -> Trade:
+        row = self._data[:self._size][i]
+        trade = Trade(float(row["entry_price"]), _timestamp(row["entry_time"]), float(row["quantity"]),
+                      self.coins[row["coin"]], int(row["entry_idx"]))
+        trade.close(float(row["exit_price"]), _timestamp(row["exit_time"]), int(row["exit_idx"]),
+                    EXIT_REASONS[row["exit_reason"]], float(row["fees"]))
+        return trade
+
+    def records(self) -> List[Dict]:
+        """Trades as plain dicts (JSON-ready), cached until the ledger changes"""
+        key = ("records", self.version)
+        if key not in self._cache:
+            rows = self._data[:self._size]
+            coins = np.array(self.coins, dtype=object)[rows["coin"]] if self._size else []
+            entry_times = _iso(rows["entry_time"])
+            exit_times = _iso(rows["exit_time"])
+            reasons = np.array(EXIT_REASONS, dtype=object)[rows["exit_reason"]]
+            self._cache[key] = [
+                {
+                    "coin": coin,
+                    "entry": entry,
+                    "exit": exit_price,
+                    "pnl": pnl,
+                    "pnl_pct": pnl_pct,
+                    "entry_time": entry_time,
+                    "exit_time": exit_time,
+                    "entry_idx": entry_idx,
+                    "exit_idx": exit_idx,
+                    "fees": fees,
+                    "exit_reason": reason,
+                }
+                for coin, entry, exit_price, pnl, pnl_pct, entry_time, exit_time, entry_idx, exit_idx, fees, reason
+                in zip(coins, rows["entry_price"].tolist(), rows["exit_price"].tolist(), rows["pnl"].tolist(),
+                       rows["pnl_pct"].tolist(), entry_times, exit_times, rows["entry_idx"].tolist(),
+                       rows["exit_idx"].tolist(), rows["fees"].tolist(), reasons)
+            ]
+        return self._cache[key]
+
+    def metrics(self, initial_balance) -> Dict:
+        """Summary metrics computed from the pnl column, cached until the ledger changes"""
+        key = ("metrics", self.version, initial_balance)
+        if key in self._cache:
+            return self._cache[key]
+        if not self._size:
+            metrics = {
+                "total_trades": 0,
+                "profitable": 0,
+                "losing": 0,
+                "win_rate": 0,
+                "total_pnl": 0,
+                "avg_profit": 0,
+                "avg_loss": 0,
+                "max_profit": 0,
+                "max_loss": 0,
+            }
+        else:
+            pnl = self.column("pnl")
+            profits = pnl[pnl > 0]
+            losses = pnl[pnl < 0]
+            total = float(pnl.sum())
+            metrics = {
+                "total_trades": self._size,
+                "profitable": len(profits),
+                "losing": len(losses),
+                "win_rate": (len(profits) / self._size) * 100,
+                "total_pnl": total,
+                "avg_profit": float(profits.mean()) if len(profits) else 0,
+                "avg_loss": float(losses.mean()) if len(losses) else 0,
+                "max_profit": float(profits.max()) if len(profits) else 0,
+                "max_loss": float(losses.min()) if len(losses) else 0,
+                "total_fees": float(self.column("fees").sum()),
+                "final_balance": initial_balance + total,
+                "return_pct": (total / initial_balance) * 100,
+            }
+        self._cache = {k: v for k, v in self._cache.items() if k[1] == self.version}
+        self._cache[key] = metrics
+        return metrics
+
+
+def _timestamp(ns):
+    return None if ns == NAT else pd.Timestamp(int(ns))
+
+
+def _iso(ns) -> List:
+    if not len(ns):
+        return []
+    text = np.datetime_as_string(ns.astype("datetime64[ns]"), unit="s")
+    return [None if t == "NaT" else t for t in text.tolist()]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Performance Metrics - Equity curve and risk-adjusted statistics
+
+The equity curve is marked to market on every bar of the run's timeline
+(the union of all coins' timestamps) from the trade ledger and each
+coin's close prices, using cumulative sums only. Risk metrics are then
+single NumPy passes over that curve, cheap enough to compute for every
+combination of a parameter sweep.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+YEAR_NS = 365.25 * 86_400 * 1e9
+
+RISK_KEYS = ("max_drawdown_pct", "max_drawdown_bars", "sharpe", "sortino",
+             "profit_factor", "expectancy", "time_in_market_pct")
+
+
+def _timeline(series) -> np.ndarray:
+    """Sorted union of per-coin (already sorted) timestamp arrays"""
+    if len(series) == 1:
+        return series[0]
+    merged = np.sort(np.concatenate(series), kind="stable")
+    keep = np.ones(len(merged), dtype=bool)
+    keep[1:] = merged[1:] != merged[:-1]
+    return merged[keep]
+
+
+def _open_after(entries, exits, n, weights=None) -> np.ndarray:
+    """Per bar t, the count (or summed weights) of trades entered at or before t and exited after t"""
+    return np.cumsum(np.bincount(entries, weights, n) - np.bincount(exits, weights, n))
+
+
+def equity_curve(ledger, prices, initial_balance) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-bar equity over the union of the coins' timestamps.
+
+    prices maps coin -> (timestamps_ns, close), with the ledger's
+    entry_idx/exit_idx indexing into those arrays. Equity at a bar is the
+    initial balance plus realized pnl (net of fees) plus open positions
+    marked at that bar's close; a coin holds its last value between its
+    own bars. Returns (timestamps_ns, equity, in_market), where in_market
+    flags bars that end with at least one position open.
+    """
+    if not prices:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=bool)
+    timeline = _timeline([ts for ts, _ in prices.values()])
+    pnl = np.zeros(len(timeline))
+    open_count = np.zeros(len(timeline), dtype=np.int64)
+
+    codes = ledger.column("coin")
+    entry_idx = ledger.column("entry_idx")
+    exit_idx = ledger.column("exit_idx")
+    quantity = ledger.column("quantity")
+    cost = quantity * ledger.column("entry_price")
+    realized = ledger.column("pnl")
+
+    for code, coin in enumerate(ledger.coins):
+        if coin not in prices:
+            continue
+        ts, close = prices[coin]
+        n = len(close)
+        sel = codes == code
+        entries, exits = entry_idx[sel], exit_idx[sel]
+        count = _open_after(entries, exits, n)
+        unrealized = np.where(count > 0, _open_after(entries, exits, n, quantity[sel]) * close
+                              - _open_after(entries, exits, n, cost[sel]), 0.0)
+        coin_pnl = np.cumsum(np.bincount(exits, realized[sel], n)) + unrealized
+
+        pos = np.searchsorted(ts, timeline, side="right") - 1
+        seen = pos >= 0
+        pnl[seen] += coin_pnl[pos[seen]]
+        open_count[seen] += count[pos[seen]]
+
+    return timeline, initial_balance + pnl, open_count > 0
+
+
+def risk_metrics(timestamps, equity, in_market, trade_pnl) -> Dict:
+    """Drawdown, Sharpe/Sortino (annualized from the median bar gap), profit factor, expectancy, exposure"""
+    metrics = dict.fromkeys(RISK_KEYS, 0.0)
+    metrics["max_drawdown_bars"] = 0
+    if len(trade_pnl):
+        gross_profit = trade_pnl[trade_pnl > 0].sum()
+        gross_loss = -trade_pnl[trade_pnl < 0].sum()
+        metrics["profit_factor"] = float(gross_profit / gross_loss) if gross_loss > 0 else None
+        metrics["expectancy"] = float(trade_pnl.mean())
+    if len(equity) < 2:
+        return metrics
+
+    peak = np.maximum.accumulate(equity)
+    drawdown = equity / peak - 1
+    bars = np.arange(len(equity))
+    last_peak = np.maximum.accumulate(np.where(drawdown < 0, 0, bars))
+    metrics["max_drawdown_pct"] = float(drawdown.min()) * 100
+    metrics["max_drawdown_bars"] = int((bars - last_peak).max())
+
+    returns = np.diff(equity) / equity[:-1]
+    gaps = np.diff(timestamps)
+    periods = YEAR_NS / np.median(gaps) if gaps.size and np.median(gaps) > 0 else 1.0
+    mean = returns.mean()
+    std = returns.std()
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    metrics["sharpe"] = float(mean / std * np.sqrt(periods)) if std > 0 else 0.0
+    metrics["sortino"] = float(mean / downside * np.sqrt(periods)) if downside > 0 else 0.0
+    metrics["time_in_market_pct"] = float(in_market.mean()) * 100
+    return metrics
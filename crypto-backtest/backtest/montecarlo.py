@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo - Robustness of a backtest under resampled trades and price paths
+
+Three resampling methods:
+
+- shuffle: the run's trades in random order. Total return is unchanged;
+  the spread is in the path, i.e. drawdown.
+- bootstrap: trades drawn with replacement, the same count per path.
+- block: each coin's bars rebuilt from blocks of consecutive log returns
+  drawn with replacement, keeping every bar's open/high/low to close
+  ratios and volume. The strategy is re-run on each synthetic history.
+
+Trade methods run as NumPy batches of (simulations x trades) matrices;
+their drawdown is measured on the trade-by-trade equity path. Block paths
+are generated per batch and backtested one simulation at a time, each
+coin's arrays going straight through the signal engine. Batches
+have a fixed size and each gets its own child of one SeedSequence, so
+results depend only on the seed, not on how many worker processes ran
+them.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import BacktestEngine, RESULTS_DIR, coin_slices
+
+MONTECARLO_DIR = os.path.join(RESULTS_DIR, "montecarlo")
+METHODS = ("shuffle", "bootstrap", "block")
+PERCENTILES = (5, 25, 50, 75, 95)
+BATCH_SIZE = {"shuffle": 1000, "bootstrap": 1000, "block": 25}
+
+# Per-process state, set by _init_worker
+_pnl = None
+_slices = []
+_strategy = None
+_options = {}
+
+
+def trade_paths(pnl, initial_balance):
+    """Return % and max drawdown % per row of a (simulations x trades) pnl matrix"""
+    equity = initial_balance + np.cumsum(pnl, axis=1)
+    equity = np.concatenate([np.full((len(pnl), 1), float(initial_balance)), equity], axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    drawdown = (equity / peak - 1).min(axis=1) * 100
+    return (equity[:, -1] / initial_balance - 1) * 100, drawdown
+
+
+def shuffle_trades(pnl, n, rng):
+    return rng.permuted(np.broadcast_to(pnl, (n, len(pnl))), axis=1)
+
+
+def bootstrap_trades(pnl, n, rng):
+    return pnl[rng.integers(0, len(pnl), size=(n, len(pnl)))]
+
+
+def block_bootstrap(arrays, n, block_size, rng):
+    """n synthetic versions of one coin's bars (dict of arrays), as a list of dicts"""
+    close = arrays["close"]
+    bars = len(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_returns = np.diff(np.log(close))
+    block_size = max(1, min(block_size, bars - 1))
+    blocks = -(-(bars - 1) // block_size)
+    starts = rng.integers(1, bars - block_size + 1, size=(n, blocks))
+    # Source bar for each synthetic bar after the first: block start + offset within the block
+    offsets = np.arange(bars - 1)
+    source = starts[:, offsets // block_size] + offsets % block_size
+    paths = close[0] * np.exp(np.cumsum(log_returns[source - 1], axis=1))
+    source = np.concatenate([np.zeros((n, 1), dtype=source.dtype), source], axis=1)
+    paths = np.concatenate([np.full((n, 1), close[0]), paths], axis=1)
+
+    ratios = {col: arrays[col] / close for col in ("open", "high", "low") if col in arrays}
+    histories = []
+    for k in range(n):
+        history = {"timestamp": arrays["timestamp"], "close": paths[k]}
+        for col, ratio in ratios.items():
+            history[col] = ratio[source[k]] * paths[k]
+        if "volume" in arrays:
+            history["volume"] = arrays["volume"][source[k]]
+        histories.append(history)
+    return histories
+
+
+def _init_worker(pnl, slices, strategy, options):
+    global _pnl, _slices, _strategy, _options
+    _pnl, _slices, _strategy, _options = pnl, slices, strategy, options
+
+
+def _run_batch(task):
+    method, size, seed = task
+    rng = np.random.default_rng(seed)
+    initial_balance = _options["initial_balance"]
+    if method == "shuffle":
+        return trade_paths(shuffle_trades(_pnl, size, rng), initial_balance)
+    if method == "bootstrap":
+        return trade_paths(bootstrap_trades(_pnl, size, rng), initial_balance)
+
+    coins = [(coin, block_bootstrap(arrays, size, _options["block_size"], rng)) for coin, arrays in _slices]
+    position_size = _strategy.get_position_size()
+    returns, drawdowns = np.empty(size), np.empty(size)
+    for k in range(size):
+        # Per-coin frames straight into the signal path, as in sweeps: no concat, regroup or trade records
+        engine = BacktestEngine(initial_balance=initial_balance)
+        for coin, histories in coins:
+            frame = pd.DataFrame(histories[k])
+            engine.ledger.extend(engine.trades_from_signals(frame, _strategy.signals(frame), coin, position_size))
+        metrics = engine.get_metrics(include_trades=False)
+        returns[k] = metrics.get("return_pct", 0)
+        drawdowns[k] = metrics["max_drawdown_pct"]
+    return returns, drawdowns
+
+
+def summarize(values) -> Dict:
+    return {
+        "mean": float(np.mean(values)),
+        "std": float(np.std(values)),
+        **{f"p{q}": float(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+    }
+
+
+def run_montecarlo(data, strategy, methods=METHODS, n_sims=1000, seed=0, workers=None,
+                   block_size=10, initial_balance=1000) -> Dict:
+    """Backtest once, then resample with each method; returns observed metrics and distributions"""
+    unknown = [method for method in methods if method not in BATCH_SIZE]
+    if unknown:
+        raise ValueError(f"Unknown Monte Carlo method(s): {', '.join(unknown)} (use {', '.join(METHODS)})")
+    engine = BacktestEngine(initial_balance=initial_balance)
+    observed = engine.run_signals(data, strategy)
+    pnl = engine.ledger.column("pnl").copy()
+    _, trade_drawdown = trade_paths(pnl[None, :], initial_balance)
+    slices = [(coin, arrays) for coin, arrays in coin_slices(data) if len(arrays["close"]) >= 10]
+    options = {"initial_balance": initial_balance, "block_size": block_size}
+
+    tasks, owners = [], []
+    seeds = np.random.SeedSequence(seed).spawn(len(METHODS))
+    for method in methods:
+        if method in ("shuffle", "bootstrap") and len(pnl) == 0:
+            continue
+        batch = BATCH_SIZE[method]
+        sizes = [min(batch, n_sims - start) for start in range(0, n_sims, batch)]
+        for size, child in zip(sizes, seeds[METHODS.index(method)].spawn(len(sizes))):
+            tasks.append((method, size, child))
+            owners.append(method)
+
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(pnl, slices, strategy, options)) as pool:
+            batches = list(pool.map(_run_batch, tasks))
+    else:
+        _init_worker(pnl, slices, strategy, options)
+        batches = [_run_batch(task) for task in tasks]
+
+    distributions = {}
+    for method in methods:
+        parts = [batch for batch, owner in zip(batches, owners) if owner == method]
+        if not parts:
+            continue
+        returns = np.concatenate([r for r, _ in parts])
+        drawdowns = np.concatenate([d for _, d in parts])
+        distributions[method] = {
+            "simulations": len(returns),
+            "return_pct": summarize(returns),
+            "max_drawdown_pct": summarize(drawdowns),
+            "prob_loss": float(np.mean(returns < 0)),
+        }
+    return {
+        "strategy": strategy.name,
+        "params": strategy.params,
+        "seed": seed,
+        "block_size": block_size,
+        "observed": {
+            **{key: observed.get(key, 0) for key in ("total_trades", "return_pct", "max_drawdown_pct")},
+            "trade_max_drawdown_pct": float(trade_drawdown[0]),
+        },
+        "distributions": distributions,
+    }
+
+
+def save_montecarlo(report):
+    os.makedirs(MONTECARLO_DIR, exist_ok=True)
+    filename = f"{MONTECARLO_DIR}/{report['strategy']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=2)
+    return filename
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Profiling - Opt-in phase timing and call counting for backtest runs
+
+Nothing here touches the engine's loops. A Profiler times named phases
+and, while a run is instrumented, temporarily replaces chosen methods on
+the strategy/engine instances with counting (optionally timing) wrappers,
+restoring the originals afterwards. A disabled Profiler installs nothing
+and its phases are no-op contexts, so an unprofiled run pays nothing per
+bar. cProfile can be layered on top for a function-level view.
+"""
+
+import cProfile
+import io
+import pstats
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict
+
+# Hooks the engines actually call; filters and bar_position are compatibility helpers they never use
+STRATEGY_CALLS = ("entry_condition", "exit_condition", "entry_rule", "exit_rule", "filter_mask")
+
+
+class Counted:
+    """Callable wrapper counting calls (and, if timed, their total wall time)"""
+
+    __slots__ = ("fn", "timed", "calls", "seconds")
+
+    def __init__(self, fn, timed=False):
+        self.fn = fn
+        self.timed = timed
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        if not self.timed:
+            return self.fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+class Profiler:
+    def __init__(self, enabled=True, cprofile_path=None):
+        self.enabled = enabled
+        self.cprofile_path = cprofile_path
+        self.phases: Dict[str, float] = {}
+        self.calls: Dict[str, Counted] = {}
+        self._installed = []
+        self._cprofile = None
+
+    @contextmanager
+    def _timed_phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def phase(self, name):
+        """Context manager adding its wall time to phase `name`"""
+        if not self.enabled:
+            return nullcontext()
+        return self._timed_phase(name)
+
+    def instrument(self, obj, name, label=None, timed=False):
+        """Wrap obj.name (a method) in a Counted until restore()"""
+        if not self.enabled:
+            return
+        counted = self.calls.get(label or name)
+        if counted is None:
+            counted = self.calls[label or name] = Counted(getattr(obj, name), timed)
+        self._installed.append((obj, name, vars(obj).get(name)))
+        setattr(obj, name, counted)
+
+    def instrument_run(self, strategy, engine):
+        """Count the strategy's per-bar hooks, time indicator preparation and metrics"""
+        for name in STRATEGY_CALLS:
+            self.instrument(strategy, name)
+        self.instrument(strategy, "prepare", "indicators", timed=True)
+        self.instrument(engine, "get_metrics", "metrics", timed=True)
+
+    def restore(self):
+        for obj, name, original in reversed(self._installed):
+            if original is not None:
+                setattr(obj, name, original)
+            else:
+                delattr(obj, name)
+        self._installed = []
+
+    @contextmanager
+    def cprofile(self):
+        """Run the block under cProfile when a cprofile_path was given"""
+        if not (self.enabled and self.cprofile_path):
+            yield
+            return
+        self._cprofile = cProfile.Profile()
+        self._cprofile.enable()
+        try:
+            yield
+        finally:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_path)
+
+    def report(self, bars=None, top=15) -> str:
+        lines = ["", "PROFILE", "-" * 50]
+        for name, seconds in self.phases.items():
+            lines.append(f"  {name:<18} {seconds * 1000:>10.1f} ms")
+            if name == "engine":
+                for label, counted in self.calls.items():
+                    if counted.timed:
+                        lines.append(f"    {label:<16} {counted.seconds * 1000:>10.1f} ms  ({counted.calls} calls)")
+        if bars is not None and self.phases.get("engine"):
+            lines.append(f"  {'bars/sec':<18} {bars / self.phases['engine']:>10,.0f}")
+        lines.append("  calls:")
+        for name, counted in self.calls.items():
+            if not counted.timed:
+                lines.append(f"    {name:<16} {counted.calls:>10,}")
+        if self._cprofile is not None:
+            out = io.StringIO()
+            pstats.Stats(self._cprofile, stream=out).sort_stats("cumulative").print_stats(top)
+            lines.append(f"\ncProfile stats saved to {self.cprofile_path} (top {top} by cumulative time):")
+            lines.append(out.getvalue())
+        return "\n".join(lines)
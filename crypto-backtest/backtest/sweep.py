@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Parameter Sweep - Grid search over strategy parameters on data loaded once
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import pandas as pd
+
+from backtest.cache import ENGINE_MODULES, IndicatorCache, code_digest, digest, frame_digest, strategy_identity
+from backtest.engine import BacktestEngine, RESULTS_DIR, coin_slices
+from data.bars import BarCache
+from strategies.base import STRATEGIES
+
+SWEEP_DIR = os.path.join(RESULTS_DIR, "sweeps")
+SUMMARY_KEYS = ("total_trades", "win_rate", "total_pnl", "avg_profit", "avg_loss", "return_pct",
+                "max_drawdown_pct", "sharpe", "sortino", "profit_factor")
+
+# Per-process state: coin frames, one indicator cache and bar cache per coin, built once, and the disk cache
+_coins = []
+_caches = {}
+_bars = {}
+_disk = None
+
+
+def parse_range(spec):
+    """Parse "start:stop:step" (stop inclusive) or "a,b,c" into a list of values"""
+    def number(text):
+        value = float(text)
+        return int(value) if value.is_integer() and "." not in text else value
+    
+    if ":" in spec:
+        start, stop, step = (number(p) for p in spec.split(":"))
+        if step <= 0:
+            raise ValueError(f"Step must be positive: {spec}")
+        count = int(round((stop - start) / step)) + 1
+        values = [start + step * k for k in range(count)]
+        if all(isinstance(v, int) for v in (start, stop, step)):
+            return values
+        return [round(v, 10) for v in values]
+    return [number(p) for p in spec.split(",")]
+
+
+def param_grid(ranges: Dict[str, List]) -> List[Dict]:
+    """Cartesian product of parameter ranges, in the order given"""
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*(ranges[n] for n in names))]
+
+
+def _init_worker(slices, disk=None):
+    global _coins, _caches, _bars, _disk
+    _coins = []
+    for coin, arrays in slices:
+        coin_data = pd.DataFrame(arrays)
+        coin_data["coin"] = coin
+        _coins.append((coin, coin_data))
+    _caches = {coin: IndicatorCache(coin_data, disk) if disk else {} for coin, coin_data in _coins}
+    _bars = {coin: BarCache(coin_data) for coin, coin_data in _coins}
+    _disk = disk
+
+
+def _run_combination(task):
+    strategy_name, params, initial_balance, data_key = task
+    strategy = STRATEGIES[strategy_name](**params)
+    key = None
+    if _disk is not None:
+        code = code_digest(*ENGINE_MODULES, type(strategy).__module__)
+        key = digest("sweep", data_key, code, strategy_identity(strategy), initial_balance)
+        row = _disk.get_json("sweeps", key)
+        if row is not None:
+            return row
+    position_size = strategy.get_position_size()
+    engine = BacktestEngine(initial_balance=initial_balance)
+    for coin, coin_data in _coins:
+        if len(coin_data) < 10:
+            continue
+        strategy.prepare(coin_data, cache=_caches[coin], bars=_bars[coin])
+        engine.ledger.extend(engine.trades_from_signals(coin_data, strategy.signals(coin_data), coin, position_size))
+    metrics = engine.get_metrics(include_trades=False)
+    row = {**params, **{name: metrics.get(name, 0) for name in SUMMARY_KEYS}}
+    if key is not None:
+        _disk.put_json("sweeps", key, row)
+    return row
+
+
+def run_sweep(data, strategy_name, ranges, workers=None, initial_balance=1000, rank_by="return_pct", cache=None):
+    """Backtest every parameter combination and return a table ranked by rank_by.
+    
+    Coins are sliced once and each worker process keeps them for its whole
+    lifetime, together with a per-coin indicator cache, so an indicator
+    shared by many combinations is computed once per worker.
+    
+    With a backtest.cache.DiskCache, indicators and each combination's
+    summary row are also kept on disk, so rerunning a sweep over the same
+    data only computes combinations it hasn't seen.
+    """
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy_name}")
+    if rank_by not in SUMMARY_KEYS:
+        raise ValueError(f"Unknown rank metric: {rank_by} (use one of {', '.join(SUMMARY_KEYS)})")
+    
+    slices = coin_slices(data)
+    data_key = frame_digest(data) if cache else None
+    tasks = [(strategy_name, params, initial_balance, data_key) for params in param_grid(ranges)]
+    
+    if workers and workers > 1:
+        # Contiguous chunks keep combinations that share indicators on one worker
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(slices, cache)) as pool:
+            rows = list(pool.map(_run_combination, tasks, chunksize=chunksize))
+    else:
+        _init_worker(slices, cache)
+        rows = [_run_combination(task) for task in tasks]
+    
+    table = pd.DataFrame(rows)
+    if len(table):
+        table = table.sort_values(rank_by, ascending=False, kind="stable").reset_index(drop=True)
+    return table
+
+
+def save_sweep(table, strategy_name):
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    filename = f"{SWEEP_DIR}/{strategy_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    table.to_csv(filename, index=False)
+    return filename
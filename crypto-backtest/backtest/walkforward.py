@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Walk-Forward Optimization - Tune on rolling train windows, score out of sample
+
+The shared timeline is cut into folds: a train window of train_bars
+followed by a test window of test_bars, rolled forward by step bars (at
+least the test length, so test windows never overlap). In each
+fold every parameter combination is scored on the train window, and the
+best one is backtested on the test window. Test-window trades from all
+folds make up the out-of-sample result.
+
+Indicators and signals are computed once per combination over each
+coin's full history and sliced per window. The indicators are causal,
+so a window sees the same values a live run would, including warmup
+from bars before the window. Folds run in parallel. Each worker keeps
+the coin data and per-combination signals for its whole lifetime, so a
+worker reuses them across all the folds it evaluates.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from backtest.cache import IndicatorCache
+from backtest.engine import BacktestEngine, RESULTS_DIR, coin_slices
+from backtest.ledger import TradeLedger
+from backtest.metrics import equity_curve, risk_metrics
+from backtest.sweep import SUMMARY_KEYS, param_grid
+from data.bars import BarCache
+from strategies.base import STRATEGIES
+
+WALKFORWARD_DIR = os.path.join(RESULTS_DIR, "walkforward")
+
+# Small grids around each strategy's defaults, used when no ranges are given
+DEFAULT_RANGES = {
+    "rsi_v3": {"period": [7, 14, 21], "oversold": [30, 40], "overbought": [60, 70]},
+    "vol_momentum_v3": {"lookback": [2, 3, 5], "stop_loss": [0.02, 0.03]},
+    "tight_band": {"ma_period": [5, 10, 20], "band": [0.01, 0.02]},
+    "scalper": {"gain_threshold": [0.01, 0.015, 0.02], "stop_loss": [0.01, 0.02]},
+    "rsi_volume": {"period": [7, 14, 21], "oversold": [35, 40], "stop_loss": [0.02, 0.03]},
+}
+
+# Per-process state: coin frames, their timestamps, indicator and bar caches, and signals per combination
+_coins = []
+_timestamps = {}
+_caches = {}
+_bars = {}
+_signals = {}
+
+
+def fold_windows(timeline, train_bars, test_bars, step=None) -> List[tuple]:
+    """(train_start, test_start, test_end) timestamps per fold; test_end is exclusive (None = open end)"""
+    step = step or test_bars
+    if step < test_bars:
+        raise ValueError(f"step ({step}) must be at least test_bars ({test_bars}) so test windows don't overlap")
+    windows = []
+    start = 0
+    while start + train_bars + test_bars <= len(timeline):
+        end = start + train_bars + test_bars
+        windows.append((timeline[start], timeline[start + train_bars], timeline[end] if end < len(timeline) else None))
+        start += step
+    return windows
+
+
+def _init_worker(slices, disk=None):
+    global _coins, _timestamps, _caches, _bars, _signals
+    _coins = []
+    _timestamps = {}
+    for coin, arrays in slices:
+        coin_data = pd.DataFrame(arrays)
+        coin_data["coin"] = coin
+        _coins.append((coin, coin_data))
+        _timestamps[coin] = arrays["timestamp"].astype("datetime64[ns]").view(np.int64)
+    _caches = {coin: IndicatorCache(coin_data, disk) if disk else {} for coin, coin_data in _coins}
+    _bars = {coin: BarCache(coin_data) for coin, coin_data in _coins}
+    _signals = {}
+
+
+def _signals_for(strategy_name, params):
+    """Full-history signals per coin for one combination, computed once per process"""
+    key = (strategy_name, tuple(params.items()))
+    if key not in _signals:
+        strategy = STRATEGIES[strategy_name](**params)
+        signals = {}
+        for coin, coin_data in _coins:
+            strategy.prepare(coin_data, cache=_caches[coin], bars=_bars[coin])
+            signals[coin] = strategy.signals(coin_data)
+        _signals[key] = (strategy.get_position_size(), signals)
+    return _signals[key]
+
+
+def _evaluate(strategy_name, params, start, end, initial_balance):
+    """Backtest one combination on the [start, end) window.
+    
+    Returns the engine (bar indices relative to the window) and the same
+    trades as a ledger indexed into each coin's full history.
+    """
+    position_size, signals = _signals_for(strategy_name, params)
+    engine = BacktestEngine(initial_balance=initial_balance)
+    absolute = TradeLedger()
+    for coin, coin_data in _coins:
+        timestamps = _timestamps[coin]
+        lo = int(np.searchsorted(timestamps, start))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end))
+        if hi - lo < 10:
+            continue
+        window = coin_data.iloc[lo:hi].reset_index(drop=True)
+        window_signals = {k: v[lo:hi] if isinstance(v, np.ndarray) else v for k, v in signals[coin].items()}
+        coin_trades = engine.trades_from_signals(window, window_signals, coin, position_size)
+        engine.ledger.extend(coin_trades)
+        coin_trades.offset(lo)
+        absolute.extend(coin_trades)
+    return engine, absolute
+
+
+def _score(metrics, rank_by):
+    value = metrics.get(rank_by)
+    return -np.inf if value is None else value
+
+
+def _run_fold(task):
+    fold, strategy_name, grid, (train_start, test_start, test_end), initial_balance, rank_by = task
+    best, best_score = None, -np.inf
+    for params in grid:
+        train, _ = _evaluate(strategy_name, params, train_start, test_start, initial_balance)
+        metrics = train.get_metrics(include_trades=False)
+        if best is None or _score(metrics, rank_by) > best_score:
+            best, best_score = params, _score(metrics, rank_by)
+    test, test_trades = _evaluate(strategy_name, best, test_start, test_end, initial_balance)
+    metrics = test.get_metrics(include_trades=False)
+    row = {
+        "fold": fold,
+        "train_start": pd.Timestamp(train_start),
+        "test_start": pd.Timestamp(test_start),
+        "test_end": None if test_end is None else pd.Timestamp(test_end),
+        **best,
+        f"train_{rank_by}": best_score,
+        **{f"test_{key}": metrics.get(key, 0) for key in SUMMARY_KEYS},
+    }
+    return row, test_trades
+
+
+def out_of_sample_metrics(data, ledger, start, end, initial_balance) -> Dict:
+    """Trade and risk metrics of the stitched test-window trades over [start, end)"""
+    prices = {
+        coin: (arrays["timestamp"].astype("datetime64[ns]").view(np.int64), arrays["close"])
+        for coin, arrays in coin_slices(data)
+    }
+    timestamps, equity, in_market = equity_curve(ledger, prices, initial_balance)
+    keep = timestamps >= start
+    if end is not None:
+        keep &= timestamps < end
+    risk = risk_metrics(timestamps[keep], equity[keep], in_market[keep], ledger.column("pnl"))
+    return {**ledger.metrics(initial_balance), **risk}
+
+
+def run_walkforward(data, strategy_name, ranges=None, train_bars=90, test_bars=30, step=None,
+                    workers=None, initial_balance=1000, rank_by="return_pct", cache=None):
+    """Walk-forward one strategy; returns (per-fold table, out-of-sample metrics).
+    
+    cache, a backtest.cache.DiskCache, keeps indicators on disk across runs.
+    """
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy_name}")
+    if rank_by not in SUMMARY_KEYS:
+        raise ValueError(f"Unknown rank metric: {rank_by} (use one of {', '.join(SUMMARY_KEYS)})")
+    ranges = ranges or DEFAULT_RANGES.get(strategy_name)
+    if not ranges:
+        raise ValueError(f"No parameter ranges to tune {strategy_name}; pass NAME=RANGE arguments")
+    grid = param_grid(ranges)
+
+    timeline = np.unique(data["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64))
+    windows = fold_windows(timeline, train_bars, test_bars, step)
+    if not windows:
+        raise ValueError(f"{len(timeline)} bars is too short for train={train_bars} + test={test_bars}")
+
+    slices = coin_slices(data)
+    tasks = [(k, strategy_name, grid, window, initial_balance, rank_by) for k, window in enumerate(windows)]
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(slices, cache)) as pool:
+            results = list(pool.map(_run_fold, tasks))
+    else:
+        _init_worker(slices, cache)
+        results = [_run_fold(task) for task in tasks]
+
+    ledger = TradeLedger()
+    for _, fold_ledger in results:
+        ledger.extend(fold_ledger)
+    metrics = out_of_sample_metrics(data, ledger, windows[0][1], windows[-1][2], initial_balance)
+    return pd.DataFrame([row for row, _ in results]), metrics
+
+
+def save_walkforward(table, strategy_name):
+    os.makedirs(WALKFORWARD_DIR, exist_ok=True)
+    filename = f"{WALKFORWARD_DIR}/{strategy_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    table.to_csv(filename, index=False)
+    return filename
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Benchmarks - Time and memory per phase for every registered strategy
+
+Generates synthetic OHLCV data (bars x coins), then for each strategy and
+engine mode times data loading (CSV parse and store load), indicator
+computation, the engine run and metrics, reporting bars/second and peak
+traced memory. Results are saved as JSON; two result files can be
+compared with a regression threshold:
+
+    python -m benchmarks.bench --sizes 2000x4,20000x8 --modes row,vectorized
+    python -m benchmarks.bench compare benchmarks/results/old.json benchmarks/results/new.json --threshold 0.1
+
+`startup` times the read-only run.py commands (results, compare, cache,
+--help) in fresh interpreters. It fails if any takes longer than the
+budget or imports a module they shouldn't need (pandas, requests, the
+engine):
+
+    python -m benchmarks.bench startup --budget 0.5
+
+`fetch` runs the real fetcher against the local stub server
+(data/stub_server.py) with injected latency and 429/500 responses. It
+fails unless every requested coin arrives despite the failures, more
+than one request was in flight at a time but never more than
+max_concurrency, and the request rate stayed under the rate limit:
+
+    python -m benchmarks.bench fetch --coins 40 --fail-rate 0.2
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import BacktestEngine
+from data.store import MarketDataStore
+from strategies.base import STRATEGIES
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+MODES = ("row", "vectorized")
+PHASES = ("load_csv", "load_store", "indicators", "engine", "metrics")
+
+RUN_PY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "run.py")
+STARTUP_COMMANDS = (("results",), ("compare",), ("cache",), ("--help",))
+STARTUP_BUDGET_S = 0.5
+HEAVY_MODULES = ("pandas", "requests", "backtest.engine")
+
+
+def synthetic_ohlcv(bars, coins, seed=0, freq="1h") -> pd.DataFrame:
+    """Random-walk OHLCV for `coins` coins of `bars` bars each, in the data/ CSV layout"""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2026-01-01", periods=bars, freq=freq)
+    frames = []
+    for c in range(coins):
+        close = np.exp(np.cumsum(rng.normal(0, 0.01, bars))) * 10 ** rng.uniform(-4, 0)
+        spread = np.abs(rng.normal(0, 0.005, bars)) * close
+        # Each bar opens at the previous close; the first opens at its own close
+        open_ = np.concatenate((close[:1], close[:-1]))
+        frames.append(pd.DataFrame({
+            "timestamp": timestamps,
+            "open": open_,
+            "high": np.maximum(open_, close) + spread,
+            "low": np.minimum(open_, close) - spread,
+            "close": close,
+            "volume": rng.uniform(1e5, 1e6, bars),
+            "coin": f"coin-{c}",
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _engine_run(engine, df, strategy, mode):
+    position_size = strategy.get_position_size()
+    if mode == "row":
+        return engine.run(df, strategy.entry_condition, strategy.exit_condition, position_size)
+    return engine.run_signals(df, strategy, position_size)
+
+
+def _metrics(engine):
+    # Drop cached metrics so they are recomputed from the ledger
+    engine._equity = None
+    engine.ledger._cache = {}
+    return engine.get_metrics(include_trades=False)
+
+
+def load_phases(df, workdir):
+    """Wall time of parsing the data as CSV and loading it from a MarketDataStore"""
+    path = os.path.join(workdir, "bench.csv")
+    df.to_csv(path, index=False)
+    store = MarketDataStore(os.path.join(workdir, "store"))
+    store.write(df)
+
+    def load_csv():
+        loaded = pd.read_csv(path)
+        loaded["timestamp"] = pd.to_datetime(loaded["timestamp"])
+        return loaded
+
+    _, csv_time = _timed(load_csv)
+    _, store_time = _timed(store.load)
+    return {"load_csv": csv_time, "load_store": store_time}
+
+
+def bench_strategy(df, name, mode, repeat=3):
+    """Best-of-repeat phase times for one strategy/mode, plus one traced pass for peak memory"""
+    best = {}
+    for _ in range(repeat):
+        strategy = STRATEGIES[name]()
+        engine = BacktestEngine(initial_balance=1000)
+        _, indicators = _timed(lambda: strategy.prepare(df))
+        metrics, run_time = _timed(lambda: _engine_run(engine, df, strategy, mode))
+        _, metrics_time = _timed(lambda: _metrics(engine))
+        # The run recomputes indicators per coin frame, and computes metrics once itself
+        times = {"indicators": indicators, "engine": max(run_time - metrics_time, 0.0), "metrics": metrics_time}
+        best = {phase: min(best.get(phase, t), t) for phase, t in times.items()}
+
+    gc.collect()
+    tracemalloc.start()
+    strategy = STRATEGIES[name]()
+    _engine_run(BacktestEngine(initial_balance=1000), df, strategy, mode)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, metrics["total_trades"], peak
+
+
+def run_benchmarks(sizes, modes=MODES, strategies=None, repeat=3, seed=0):
+    results = []
+    for bars, coins in sizes:
+        df = synthetic_ohlcv(bars, coins, seed)
+        total_bars = bars * coins
+        with tempfile.TemporaryDirectory() as workdir:
+            loads = load_phases(df, workdir)
+        for name in strategies or STRATEGIES:
+            for mode in modes:
+                phases, trades, peak = bench_strategy(df, name, mode, repeat)
+                phases = {**loads, **phases}
+                run_time = phases["indicators"] + phases["engine"] + phases["metrics"]
+                row = {
+                    "strategy": name,
+                    "mode": mode,
+                    "bars": bars,
+                    "coins": coins,
+                    "trades": trades,
+                    "phases": phases,
+                    "bars_per_sec": total_bars / run_time if run_time > 0 else None,
+                    "peak_mem_mb": peak / 2 ** 20,
+                }
+                results.append(row)
+                print(f"{name:<16} {mode:<10} {bars:>8}x{coins:<4} {row['bars_per_sec']:>12,.0f} bars/s "
+                      f"{row['peak_mem_mb']:>8.1f} MB  " +
+                      " ".join(f"{phase}={phases[phase] * 1000:.1f}ms" for phase in PHASES))
+    return results
+
+
+def _loaded_modules(command, workdir, modules=HEAVY_MODULES):
+    """Which of modules a fresh interpreter has imported after running run.py command"""
+    script = (
+        "import contextlib, io, json, runpy, sys\n"
+        f"sys.argv = [{RUN_PY!r}, *{list(command)!r}]\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    try:\n"
+        f"        runpy.run_path({RUN_PY!r}, run_name='__main__')\n"
+        "    except SystemExit:\n"
+        "        pass\n"
+        f"print(json.dumps([m for m in {list(modules)!r} if m in sys.modules]))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=workdir, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def startup_times(commands=STARTUP_COMMANDS, repeat=5):
+    """Median wall time of each run.py command in a fresh interpreter, plus the heavy modules it loaded.
+    
+    Commands run in an empty directory, so they see no results and leave
+    the real ones alone. A bare interpreter is timed too, for reference.
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for command in [None, *commands]:
+            argv = [sys.executable, "-c", "pass"] if command is None else [sys.executable, RUN_PY, *command]
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                subprocess.run(argv, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+                times.append(time.perf_counter() - start)
+            rows.append({
+                "command": "python -c pass" if command is None else " ".join(command),
+                "seconds": float(np.median(times)),
+                "heavy_modules": [] if command is None else _loaded_modules(command, workdir),
+            })
+    return rows
+
+
+def check_startup(rows, budget=STARTUP_BUDGET_S):
+    """Print startup times; returns the commands over budget or importing heavy modules"""
+    failures = []
+    print(f"{'Command':<20} {'Median':>10}  Heavy imports")
+    for row in rows:
+        flag = ""
+        if row["command"] != "python -c pass" and (row["seconds"] > budget or row["heavy_modules"]):
+            failures.append(row)
+            flag = "  OVER BUDGET" if row["seconds"] > budget else "  HEAVY IMPORTS"
+        print(f"{row['command']:<20} {row['seconds'] * 1000:>8.0f}ms  {', '.join(row['heavy_modules']) or '-'}{flag}")
+    return failures
+
+
+def fetch_check(coins=40, fail_rate=0.2, latency=0.2, rate_limit=1200, max_concurrency=4, burst=4):
+    """Fetch a stub universe and coins[:n] charts; returns (report, failures)"""
+    from data.data_fetcher import CryptoDataFetcher
+    from data.stub_server import start_stub_server
+    from data.universe import UniverseScreener
+    
+    server, base_url = start_stub_server(coins=coins * 5, latency=latency, fail_rate=fail_rate)
+    fetcher = CryptoDataFetcher(base_url=base_url, rate_limit=rate_limit, max_concurrency=max_concurrency,
+                                max_retries=6, backoff=0.01, burst=burst)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            screener = UniverseScreener(fetcher, path=os.path.join(workdir, "universe.db"), per_page=50)
+            try:
+                universe = screener.screen(limit=coins)
+            finally:
+                screener.close()
+            coin_ids = [c["id"] for c in universe]
+            store = MarketDataStore(os.path.join(workdir, "store"))
+            fetcher.fetch_and_save(coin_ids, days=2, store=store)
+            stored = store.coins()
+    finally:
+        server.shutdown()
+    
+    times = sorted(t for t, _ in server.state.requests)
+    elapsed = times[-1] - times[0] if len(times) > 1 else 0.0
+    # A token bucket allows at most `burst` requests plus rate x elapsed
+    allowed = burst + rate_limit / 60 * elapsed
+    summary = fetcher.stats.summary()
+    report = {
+        "requests": len(times), "injected": server.state.failed, "retries": summary["retries"], "elapsed_s": elapsed,
+        "rate_per_min": (len(times) - burst) / elapsed * 60 if elapsed else 0.0,
+        "peak_in_flight": server.state.peak_active, "coins": len(coin_ids), "stored": len(stored),
+    }
+    failures = []
+    if len(coin_ids) < coins or sorted(stored) != sorted(coin_ids):
+        failures.append(f"stored {len(stored)} of {coins} coins")
+    if summary["retries"] != server.state.failed:
+        failures.append(f"{summary['retries']} retries for {server.state.failed} injected failures")
+    if not min(2, max_concurrency) <= server.state.peak_active <= max_concurrency:
+        failures.append(f"{server.state.peak_active} requests in flight (want {min(2, max_concurrency)}.."
+                        f"{max_concurrency})")
+    if len(times) > allowed + 1:
+        failures.append(f"{len(times)} requests in {elapsed:.2f}s exceeds the rate limit ({allowed:.0f})")
+    return report, failures
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def save_benchmarks(results, path=None):
+    if path is None:
+        os.makedirs(BENCH_DIR, exist_ok=True)
+        path = os.path.join(BENCH_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def compare_benchmarks(baseline, current, threshold=0.1):
+    """Print per-case throughput change; returns the cases slower than baseline by more than threshold"""
+    key = lambda r: (r["strategy"], r["mode"], r["bars"], r["coins"])
+    before = {key(r): r for r in baseline["results"]}
+    regressions = []
+    print(f"{'Case':<40} {'Before':>12} {'After':>12} {'Change':>8}")
+    for row in current["results"]:
+        old = before.get(key(row))
+        if old is None or not old["bars_per_sec"] or not row["bars_per_sec"]:
+            continue
+        change = row["bars_per_sec"] / old["bars_per_sec"] - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append((key(row), change))
+            flag = "  REGRESSION"
+        case = f"{row['strategy']}/{row['mode']} {row['bars']}x{row['coins']}"
+        print(f"{case:<40} {old['bars_per_sec']:>12,.0f} {row['bars_per_sec']:>12,.0f} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def parse_sizes(spec):
+    """"2000x4,20000x8" -> [(2000, 4), (20000, 8)]"""
+    return [tuple(int(v) for v in size.split("x")) for size in spec.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest="command")
+    run = sub.add_parser("run", help="run the benchmarks (default)")
+    run.add_argument("--sizes", type=parse_sizes, default=parse_sizes("2000x4,20000x4"), help="bars x coins list")
+    run.add_argument("--modes", default=",".join(MODES))
+    run.add_argument("--strategies", default=None, help="comma-separated names (default: all)")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--output", default=None)
+    compare = sub.add_parser("compare", help="compare two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.1, help="allowed throughput drop (0.1 = 10%%)")
+    startup = sub.add_parser("startup", help="check read-only CLI startup time against a budget")
+    startup.add_argument("--budget", type=float, default=STARTUP_BUDGET_S, help="seconds per command")
+    startup.add_argument("--repeat", type=int, default=5)
+    fetch = sub.add_parser("fetch", help="check the fetcher against the local stub server")
+    fetch.add_argument("--coins", type=int, default=40)
+    fetch.add_argument("--fail-rate", type=float, default=0.2)
+    fetch.add_argument("--latency", type=float, default=0.2, help="seconds per stub response")
+    fetch.add_argument("--rate-limit", type=int, default=1200, help="requests per minute")
+    fetch.add_argument("--max-concurrency", type=int, default=4)
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("run", "compare", "startup", "fetch", "-h", "--help"):
+        argv = ["run", *argv]
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare_benchmarks(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        return 0
+
+    if args.command == "startup":
+        failures = check_startup(startup_times(repeat=args.repeat), args.budget)
+        if failures:
+            print(f"\n{len(failures)} command(s) over the {args.budget:.2f}s budget or importing heavy modules")
+            return 1
+        return 0
+
+    if args.command == "fetch":
+        report, failures = fetch_check(args.coins, args.fail_rate, args.latency, args.rate_limit,
+                                       args.max_concurrency)
+        print(" ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                       for key, value in report.items()))
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        return 1 if failures else 0
+
+    strategies = args.strategies.split(",") if args.strategies else None
+    results = run_benchmarks(args.sizes, args.modes.split(","), strategies, args.repeat, args.seed)
+    print(f"\nResults saved to {save_benchmarks(results, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
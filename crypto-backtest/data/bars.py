@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Bar Cache - Serve any timeframe from the finest stored bars
+
+Bars are stored once at their finest granularity; coarser timeframes are
+resampled on demand and memoized in an LRU keyed by (coin, timeframe,
+start, end), so repeated backtests over the same slice reuse them.
+shared_cache() keeps one BarCache per store for the whole process.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+BASE_SAMPLE = 16  # leading bars a coin's stored timeframe is inferred from
+
+TIMEFRAMES = {"1m": 60_000, "5m": 300_000, "15m": 900_000, "1h": 3_600_000, "4h": 14_400_000, "1d": 86_400_000}
+
+
+def _ms(timestamps) -> np.ndarray:
+    return np.asarray(timestamps, dtype="datetime64[ns]").view(np.int64) // 1_000_000
+
+
+def infer_timeframe(timestamps) -> str:
+    """Timeframe label for bars spaced by their median timestamp gap"""
+    ms = _ms(timestamps)
+    if len(ms) < 2:
+        raise ValueError("Need at least two bars to infer a timeframe")
+    step = int(np.median(np.diff(np.sort(ms))))
+    for label, size in TIMEFRAMES.items():
+        if size == step:
+            return label
+    raise ValueError(f"Bar spacing of {step}ms is not a known timeframe")
+
+
+def resample_bars(df, timeframe) -> pd.DataFrame:
+    """Aggregate one coin's time-sorted OHLCV bars into a coarser timeframe.
+    
+    Bars are labelled by their start time; open/close take the first/last
+    bar, high/low the extremes and volume the sum.
+    """
+    size = TIMEFRAMES[timeframe]
+    ms = _ms(df["timestamp"])
+    buckets = ms // size
+    bars, first = np.unique(buckets, return_index=True)
+    last = np.append(first[1:], len(buckets)) - 1
+    out = {"timestamp": (bars * size).astype("datetime64[ms]").astype("datetime64[ns]")}
+    for col, reduce in (("open", None), ("high", np.maximum), ("low", np.minimum), ("close", None), ("volume", np.add)):
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy(dtype=np.float64)
+        if col == "open":
+            out[col] = values[first]
+        elif col == "close":
+            out[col] = values[last]
+        else:
+            out[col] = reduce.reduceat(values, first)
+    resampled = pd.DataFrame(out)
+    if "coin" in df.columns and len(df):
+        resampled["coin"] = df["coin"].iloc[0]
+    return resampled
+
+
+def align_to(timestamps, timeframe, higher_timestamps, higher_timeframe, values) -> np.ndarray:
+    """Map higher-timeframe values onto lower bars without lookahead.
+    
+    Each lower bar gets the value of the latest higher bar that had closed
+    by the time the lower bar closed; NaN before the first one.
+    """
+    closes = _ms(timestamps) + TIMEFRAMES[timeframe]
+    higher_closes = _ms(higher_timestamps) + TIMEFRAMES[higher_timeframe]
+    pos = np.searchsorted(higher_closes, closes, side="right") - 1
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(pos >= 0, values[np.maximum(pos, 0)], np.nan)
+
+
+class BarCache:
+    """LRU of resampled bars over a MarketDataStore or an in-memory frame"""
+    
+    def __init__(self, source, max_entries=128):
+        self.source = source
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.base_timeframes = {}
+        self.hits = 0
+        self.misses = 0
+        self._positions = None  # frame source: coin -> row positions
+    
+    def coins(self):
+        if isinstance(self.source, pd.DataFrame):
+            return list(self._coin_positions())
+        return self.source.coins()
+    
+    def _coin_positions(self):
+        if self._positions is None:
+            self._positions = self.source.groupby("coin", sort=False).indices
+        return self._positions
+    
+    def _load_base(self, coin, start, end) -> pd.DataFrame:
+        if isinstance(self.source, pd.DataFrame):
+            positions = self._coin_positions().get(coin, np.array([], dtype=np.int64))
+            df = self.source.iloc[positions]
+            if start is not None:
+                df = df[df["timestamp"] >= pd.Timestamp(start)]
+            if end is not None:
+                df = df[df["timestamp"] <= pd.Timestamp(end)]
+            return df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+        return self.source.load(coins=[coin], start=start, end=end)
+    
+    def base_timeframe(self, coin) -> str:
+        """Stored timeframe of coin, inferred from its first BASE_SAMPLE bars only"""
+        if coin not in self.base_timeframes:
+            if isinstance(self.source, pd.DataFrame):
+                positions = self._coin_positions().get(coin, np.array([], dtype=np.int64))
+                timestamps = np.sort(self.source["timestamp"].to_numpy()[positions])[:BASE_SAMPLE]
+            else:
+                timestamps = self.source.first_timestamps(coin, BASE_SAMPLE).view("datetime64[ns]")
+            self.base_timeframes[coin] = infer_timeframe(timestamps)
+        return self.base_timeframes[coin]
+    
+    def get(self, coin, timeframe=None, start=None, end=None) -> pd.DataFrame:
+        """Bars for coin at timeframe (default: as stored) between start and end.
+        
+        The returned frame is shared with the cache; treat it as read-only.
+        """
+        base = self.base_timeframe(coin)
+        timeframe = timeframe or base
+        if timeframe not in TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe: {timeframe}")
+        if TIMEFRAMES[timeframe] % TIMEFRAMES[base]:
+            raise ValueError(f"{coin} is stored at {base}; cannot serve {timeframe}")
+        
+        key = (coin, timeframe, None if start is None else str(start), None if end is None else str(end))
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        
+        if timeframe == base:
+            bars = self._load_base(coin, start, end)
+        else:
+            bars = resample_bars(self.get(coin, base, start, end), timeframe)
+        self.entries[key] = bars
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return bars
+    
+    def load(self, coins=None, timeframe=None, start=None, end=None) -> pd.DataFrame:
+        """Long-format frame of several coins at one timeframe"""
+        frames = [self.get(coin, timeframe, start, end) for coin in (coins or self.coins())]
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return pd.DataFrame(columns=["timestamp", "open", "high", "low", "close", "volume", "coin"])
+        return pd.concat(frames, ignore_index=True)
+
+
+_shared = {}
+
+
+def shared_cache(store) -> BarCache:
+    """The process-wide BarCache over store (one per store root)"""
+    if store.root not in _shared:
+        _shared[store.root] = BarCache(store)
+    return _shared[store.root]
@@ -5,84 +5,247 @@ Data Fetcher - Fetch crypto market data from CoinGecko API
 
 import requests
 import pandas as pd
+import numpy as np
+import threading
 import time
 import os
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from data.bars import TIMEFRAMES
 
 DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BAR_SIZES = TIMEFRAMES
 
-class CryptoDataFetcher:
+
+def _points(pairs) -> np.ndarray:
+    """[[ms, value], ...] as an (n, 2) float array sorted by timestamp"""
+    points = np.asarray(pairs or [], dtype=np.float64).reshape(-1, 2)
+    return points[np.argsort(points[:, 0], kind="stable")]
+
+
+def resample_ohlcv(price_ts, price, volume_ts, volume, bar_ms, coin_id):
+    """Bucket price/volume points into OHLCV bars of bar_ms milliseconds.
+    
+    Both series are bucketed by their own timestamps, so they need not have
+    the same length or sampling. Bars are labelled by their start time;
+    bars without any price point are dropped, and a bar's volume is the sum
+    of the volume points falling inside it (0 if none). Null (NaN) or
+    infinite points are ignored, so they never reach the bars.
+    """
+    finite = np.isfinite(price_ts) & np.isfinite(price)
+    price_ts, price = price_ts[finite], price[finite]
+    finite = np.isfinite(volume_ts) & np.isfinite(volume)
+    volume_ts, volume = volume_ts[finite], volume[finite]
+    if not len(price):
+        return pd.DataFrame(columns=["timestamp", "open", "high", "low", "close", "volume", "coin"])
+    
+    price_bars = price_ts.astype(np.int64) // bar_ms
+    bars, first = np.unique(price_bars, return_index=True)
+    last = np.append(first[1:], len(price_bars)) - 1
+    
+    volume_bars = volume_ts.astype(np.int64) // bar_ms
+    pos = np.searchsorted(bars, volume_bars)
+    pos_clipped = np.minimum(pos, len(bars) - 1)
+    matched = bars[pos_clipped] == volume_bars
+    bar_volume = np.bincount(pos_clipped[matched], weights=volume[matched], minlength=len(bars))
+    
+    return pd.DataFrame({
+        "timestamp": (bars * bar_ms).astype("datetime64[ms]").astype("datetime64[ns]"),
+        "open": price[first],
+        "high": np.maximum.reduceat(price, first),
+        "low": np.minimum.reduceat(price, first),
+        "close": price[last],
+        "volume": bar_volume,
+        "coin": coin_id,
+    })
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+    
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RequestStats:
+    """Per-request timing records collected across fetch threads"""
+    
     def __init__(self):
-        self.base_url = "https://api.coingecko.com/api/v3"
-        self.rate_limit = 10
+        self.records = []
+        self.lock = threading.Lock()
+    
+    def record(self, path, status, elapsed, attempts):
+        with self.lock:
+            self.records.append({"path": path, "status": status, "elapsed": elapsed, "attempts": attempts})
+    
+    def summary(self):
+        with self.lock:
+            records = list(self.records)
+        if not records:
+            return {"requests": 0}
+        elapsed = np.array([r["elapsed"] for r in records])
+        return {
+            "requests": len(records),
+            "errors": sum(1 for r in records if r["status"] != 200),
+            "retries": sum(r["attempts"] - 1 for r in records),
+            "mean_s": float(elapsed.mean()),
+            "p50_s": float(np.percentile(elapsed, 50)),
+            "p95_s": float(np.percentile(elapsed, 95)),
+            "max_s": float(elapsed.max()),
+        }
+
+
+class CryptoDataFetcher:
+    def __init__(self, base_url="https://api.coingecko.com/api/v3", rate_limit=10, max_concurrency=4,
+                 max_retries=3, backoff=1.0, timeout=30, burst=1, bar_size="1h"):
+        if bar_size not in BAR_SIZES:
+            raise ValueError(f"Unknown bar size: {bar_size} (use one of {', '.join(BAR_SIZES)})")
+        self.base_url = base_url
+        self.rate_limit = rate_limit  # requests per minute
+        self.bar_size = bar_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate_limit / 60, capacity=burst)
+        self.stats = RequestStats()
+        # One pooled session shared by all fetch threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    
+    def _get(self, path, params=None):
+        """GET base_url + path under the rate limit, retrying 429/5xx with backoff"""
+        url = f"{self.base_url}{path}"
+        for attempt in range(1, self.max_retries + 2):
+            self.limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt > self.max_retries:
+                    self.stats.record(path, None, time.monotonic() - start, attempt)
+                    raise
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                continue
+            elapsed = time.monotonic() - start
+            if response.status_code in RETRY_STATUSES and attempt <= self.max_retries:
+                retry_after = response.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff * 2 ** (attempt - 1)
+                time.sleep(delay)
+                continue
+            self.stats.record(path, response.status_code, elapsed, attempt)
+            response.raise_for_status()
+            return response.json()
         
     def get_coin_market_data(self, vs_currency="usd", per_page=100, page=1):
-        url = f"{self.base_url}/coins/markets"
         params = {"vs_currency": vs_currency, "order": "market_cap_desc", "per_page": per_page, "page": page}
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return self._get("/coins/markets", params)
     
     def get_coin_market_chart(self, coin_id, days=7):
         """Get OHLC + volume data"""
-        url = f"{self.base_url}/coins/{coin_id}/market_chart"
         params = {"vs_currency": "usd", "days": days}
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        return self.chart_to_ohlcv(self._get(f"/coins/{coin_id}/market_chart", params), coin_id)
+    
+    def get_coin_market_chart_range(self, coin_id, start, end):
+        """Get OHLC + volume data between two timestamps (UTC)"""
+        params = {
+            "vs_currency": "usd",
+            "from": int(pd.Timestamp(start).timestamp()),
+            "to": int(pd.Timestamp(end).timestamp()),
+        }
+        return self.chart_to_ohlcv(self._get(f"/coins/{coin_id}/market_chart/range", params), coin_id)
+    
+    def chart_to_ohlcv(self, data, coin_id):
+        """Convert a market_chart response into OHLCV bars of self.bar_size"""
+        prices = _points(data.get("prices"))
+        if not len(prices):
+            return None
+        volumes = _points(data.get("total_volumes"))
+        return resample_ohlcv(prices[:, 0], prices[:, 1], volumes[:, 0], volumes[:, 1],
+                              BAR_SIZES[self.bar_size], coin_id)
+    
+    def get_cheap_coins(self, max_price=0.01, limit=20, refresh=False):
+        """Coins priced at most max_price, by market-cap rank, from the cached universe snapshot.
         
-        prices = data.get("prices", [])
-        volumes = data.get("total_volumes", [])
+        The full market list is fetched at most once per UniverseScreener
+        ttl (or now, with refresh); see data.universe.
+        """
+        from data.universe import UniverseScreener
+        screener = UniverseScreener(self)
+        try:
+            if refresh:
+                screener.refresh(force=True)
+            return screener.screen(max_price=max_price, limit=limit)
+        finally:
+            screener.close()
+    
+    def missing_range(self, last_timestamp, days, now=None):
+        """Range still to fetch for a coin whose newest stored bar is last_timestamp.
         
-        if not prices:
+        Returns (start, end), or None when the coin is already current. The
+        start is the last stored bar itself, so a bar that was still forming
+        when it was stored gets refetched and overwritten.
+        """
+        now = now if now is not None else pd.Timestamp.now("UTC").tz_localize(None)
+        if last_timestamp is None:
+            return now - pd.Timedelta(days=days), now
+        if now - last_timestamp < pd.Timedelta(milliseconds=BAR_SIZES[self.bar_size]):
             return None
-            
-        rows = []
-        for i in range(len(prices)):
-            rows.append({
-                "timestamp": pd.to_datetime(prices[i][0], unit="ms"),
-                "price": prices[i][1],
-                "volume": volumes[i][1] if i < len(volumes) else 0
-            })
-        
-        df = pd.DataFrame(rows)
+        return max(last_timestamp, now - pd.Timedelta(days=days)), now
+    
+    def _fetch_missing(self, coin_id, window):
+        print(f"Fetching {coin_id} from {window[0]}...")
+        try:
+            return self.get_coin_market_chart_range(coin_id, *window)
+        except Exception as e:
+            print(f"Error fetching {coin_id}: {e}")
+            return None
+    
+    def fetch_and_save(self, coin_ids, days=7, store=None):
+        """Fetch only bars missing from the store for each coin and merge them in.
         
-        # Resample to hourly OHLCV
-        df.set_index("timestamp", inplace=True)
-        resampled = df.resample("1h").agg({
-            "price": ["first", "high", "low", "last"],
-            "volume": "sum"
-        })
-        resampled.columns = ["open", "high", "low", "close", "volume"]
-        resampled.reset_index(inplace=True)
-        resampled["coin"] = coin_id
-        resampled.dropna(inplace=True)
-        return resampled
-    
-    def get_cheap_coins(self, max_price=0.01, limit=20):
-        markets = self.get_coin_market_data(per_page=250)
-        cheap = [c for c in markets if c.get("current_price", 1) <= max_price]
-        return cheap[:limit]
-    
-    def fetch_and_save(self, coin_ids, days=7):
-        os.makedirs(DATA_DIR, exist_ok=True)
+        Up to max_concurrency requests are in flight at once; the shared
+        token bucket keeps the overall request rate under rate_limit.
+        """
+        from data.store import MarketDataStore
+        store = store or MarketDataStore()
         
-        all_data = []
+        pending = []
         for coin_id in coin_ids:
-            print(f"Fetching {coin_id}...")
-            try:
-                df = self.get_coin_market_chart(coin_id, days=days)
-                if df is not None and len(df) > 0:
-                    all_data.append(df)
-                time.sleep(60 / self.rate_limit)
-            except Exception as e:
-                print(f"Error fetching {coin_id}: {e}")
+            window = self.missing_range(store.last_timestamp(coin_id), days)
+            if window is None:
+                print(f"{coin_id} is up to date")
+            else:
+                pending.append((coin_id, window))
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            frames = list(pool.map(lambda item: self._fetch_missing(*item), pending))
+        all_data = [df for df in frames if df is not None and len(df) > 0]
         
         if all_data:
             combined = pd.concat(all_data, ignore_index=True)
-            output_file = f"{DATA_DIR}/ohlcv_{datetime.now().strftime('%Y%m%d')}.csv"
-            combined.to_csv(output_file, index=False)
-            print(f"Saved {len(combined)} rows to {output_file}")
+            store.write(combined)
+            print(f"Saved {len(combined)} rows to {store.root}")
             return combined
         return None
 
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Panel - OHLCV as aligned 2-D arrays, one row per timestamp, one column per coin
+
+Long-format frames hold each coin's bars as separate rows, so questions
+across the universe ("which coins are strongest on this bar") need a
+per-coin filter and a join. A Panel pivots the bars once onto the union
+timeline of all coins: panel["close"][t, c] is coin c's close on bar t,
+NaN where that coin has no bar, and panel.valid marks the cells holding
+a real bar. Row-wise NumPy operations then rank or screen every coin at
+once.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from data.store import VALUE_COLUMNS
+
+
+class Panel:
+    def __init__(self, timestamps, coins, fields, valid):
+        self.timestamps = timestamps  # int64 ns, ascending
+        self.coins: List[str] = list(coins)
+        self.fields: Dict[str, np.ndarray] = fields
+        self.valid = valid
+
+    @classmethod
+    def from_columns(cls, coins, codes, timestamps, columns) -> "Panel":
+        """Panel from flat arrays: coin code, int64 ns timestamp and values per bar.
+
+        A repeated (timestamp, coin) keeps its last row. A cell is valid when
+        the bar's close is finite.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        timeline = np.sort(timestamps)
+        if len(timeline):
+            timeline = timeline[np.append(True, timeline[1:] != timeline[:-1])]
+        rows = np.searchsorted(timeline, timestamps)
+        shape = (len(timeline), len(coins))
+        fields = {}
+        for name, values in columns.items():
+            panel = np.full(shape, np.nan)
+            panel[rows, codes] = values
+            fields[name] = panel
+        valid = np.isfinite(fields["close"]) if "close" in fields else np.zeros(shape, dtype=bool)
+        return cls(timeline, coins, fields, valid)
+
+    @classmethod
+    def from_frame(cls, df, columns=VALUE_COLUMNS) -> "Panel":
+        """Pivot a long frame (timestamp, coin and value columns); coins keep first-seen order"""
+        codes, coins = pd.factorize(df["coin"])
+        timestamps = df["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        values = {name: df[name].to_numpy(dtype=float) for name in columns if name in df}
+        return cls.from_columns(list(coins), codes, timestamps, values)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self.fields[name]
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    @property
+    def shape(self):
+        return self.valid.shape
+
+    def ffill(self, name) -> np.ndarray:
+        """Field with each coin's last valid value carried forward (NaN before its first bar)"""
+        values = self.fields[name]
+        rows = np.where(self.valid, np.arange(len(self))[:, None], -1)
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        filled = values[np.maximum(rows, 0), np.arange(values.shape[1])]
+        filled[rows < 0] = np.nan
+        return filled
+
+    def bar_index(self) -> np.ndarray:
+        """Per cell, the coin's own bar position of its last valid bar so far (-1 before the first)"""
+        return np.cumsum(self.valid, axis=0) - 1
+
+    def coin(self, c) -> Dict[str, np.ndarray]:
+        """One coin's valid bars as 1-D arrays, with "timestamp" in int64 ns"""
+        rows = self.valid[:, c]
+        return {"timestamp": self.timestamps[rows], **{name: values[rows, c] for name, values in self.fields.items()}}
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Replay - Feed stored market data as a stream of bars
+"""
+
+import pandas as pd
+
+
+def replay_csv(path, chunksize=10_000):
+    """Yield bars (dicts) from a CSV in file order, reading it chunk by chunk"""
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk["timestamp"] = pd.to_datetime(chunk["timestamp"])
+        yield from chunk.to_dict("records")
+
+
+def replay_frame(df):
+    """Yield bars from a loaded frame in time order across coins"""
+    ordered = df.sort_values(["timestamp", "coin"], kind="stable")
+    yield from ordered.to_dict("records")
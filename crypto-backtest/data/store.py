@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Market Data Store - Columnar OHLCV storage partitioned by coin and month
+
+Layout: <root>/<coin>/<YYYY-MM>/<column>.npy, one typed array per column
+(timestamp as int64 nanoseconds, prices and volume as float64), sorted by
+timestamp. Partitions are opened memory-mapped, so loading a coin/date
+range only reads the months and rows it covers.
+"""
+
+import os
+import shutil
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "store")
+VALUE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def _to_ns(values) -> np.ndarray:
+    """Timestamps (datetime-like or strings) to int64 nanoseconds"""
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def _month_key(ns):
+    return str(np.datetime64(int(ns), "ns").astype("datetime64[M]"))
+
+
+class MarketDataStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+    
+    def coins(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+    
+    def partitions(self, coin) -> List[str]:
+        path = os.path.join(self.root, coin)
+        if not os.path.isdir(path):
+            return []
+        # A month mid-swap (or left mid-swap by a crash) is read from its .old copy
+        months = {d[:-4] if d.endswith(".old") else d for d in os.listdir(path)
+                  if not d.startswith(".") and not d.endswith(".tmp")}
+        return sorted(months)
+    
+    def last_timestamp(self, coin) -> Optional[pd.Timestamp]:
+        """Newest stored bar for coin, or None if the coin has no data"""
+        partitions = self.partitions(coin)
+        if not partitions:
+            return None
+        ts = self._read_partition(coin, partitions[-1])["timestamp"]
+        return pd.Timestamp(int(ts[-1]), unit="ns") if len(ts) else None
+    
+    def first_timestamps(self, coin, n) -> np.ndarray:
+        """Timestamps (int64 ns) of coin's oldest n stored bars, read from as few partitions as needed"""
+        chunks, count = [], 0
+        for month in self.partitions(coin):
+            ts = self._read_partition(coin, month)["timestamp"]
+            chunks.append(np.array(ts[:n - count]))
+            count += len(chunks[-1])
+            if count >= n:
+                break
+        return np.concatenate(chunks) if chunks else np.array([], dtype=np.int64)
+    
+    def _read_partition(self, coin, month, mmap=True) -> Dict[str, np.ndarray]:
+        path = os.path.join(self.root, coin, month)
+        if not os.path.isdir(path) and os.path.isdir(path + ".old"):
+            path += ".old"
+        arrays = {}
+        for name in os.listdir(path):
+            if name.endswith(".npy"):
+                arrays[name[:-4]] = np.load(os.path.join(path, name), mmap_mode="r" if mmap else None)
+        return arrays
+    
+    def _restore_partition(self, coin, month):
+        """Put back a partition an interrupted write left renamed aside (see _write_partition)"""
+        path = os.path.join(self.root, coin, month)
+        if os.path.isdir(path + ".old") and not os.path.isdir(path):
+            os.replace(path + ".old", path)
+    
+    def _write_partition(self, coin, month, arrays):
+        path = os.path.join(self.root, coin, month)
+        tmp, old = path + ".tmp", path + ".old"
+        self._restore_partition(coin, month)
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.rmtree(old, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), values)
+        # Swap the finished partition in with renames only, so the old one is never deleted before
+        # its replacement is in place and readers never see a partial write
+        if os.path.isdir(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+    
+    def write(self, df) -> int:
+        """Merge df (timestamp, coin and OHLCV columns) into the store.
+        
+        Rows are deduplicated by timestamp per coin, newer data winning.
+        Returns the number of rows written.
+        """
+        written = 0
+        timestamps = _to_ns(df["timestamp"])
+        columns = [c for c in VALUE_COLUMNS if c in df.columns]
+        for coin, positions in df.groupby("coin", sort=False).indices.items():
+            ts = timestamps[positions]
+            months = ts.astype("datetime64[ns]").astype("datetime64[M]")
+            for month in np.unique(months):
+                rows = positions[months == month]
+                key = str(month)
+                new = {"timestamp": timestamps[rows]}
+                for col in columns:
+                    new[col] = df[col].to_numpy(dtype=np.float64)[rows]
+                self._restore_partition(coin, key)
+                if key in self.partitions(coin):
+                    new = self._merge(self._read_partition(coin, key, mmap=False), new)
+                else:
+                    new = self._merge({}, new)
+                self._write_partition(coin, key, new)
+                written += len(rows)
+        return written
+    
+    @staticmethod
+    def _merge(old, new) -> Dict[str, np.ndarray]:
+        names = list(dict.fromkeys([*old, *new]))
+        size_old = len(old["timestamp"]) if old else 0
+        size_new = len(new["timestamp"])
+        merged = {}
+        for name in names:
+            dtype = np.int64 if name == "timestamp" else np.float64
+            a = old[name] if name in old else np.full(size_old, np.nan, dtype=dtype)
+            b = new[name] if name in new else np.full(size_new, np.nan, dtype=dtype)
+            merged[name] = np.concatenate([a, b]).astype(dtype)
+        # Stable sort then keep the last row per timestamp, i.e. the newest
+        order = np.argsort(merged["timestamp"], kind="stable")
+        ts = merged["timestamp"][order]
+        keep = np.append(ts[1:] != ts[:-1], True)
+        return {name: values[order][keep] for name, values in merged.items()}
+    
+    def _load_arrays(self, coins, start, end, columns):
+        """(coin, {column: ndarray}) for coins with rows in start <= timestamp <= end"""
+        coins = self.coins() if coins is None else list(coins)
+        start_ns = None if start is None else int(_to_ns([start])[0])
+        end_ns = None if end is None else int(_to_ns([end])[0])
+        first_month = None if start_ns is None else _month_key(start_ns)
+        last_month = None if end_ns is None else _month_key(end_ns)
+        wanted = list(columns) if columns is not None else None
+        
+        for coin in coins:
+            chunks = []
+            for month in self.partitions(coin):
+                if first_month is not None and month < first_month:
+                    continue
+                if last_month is not None and month > last_month:
+                    continue
+                arrays = self._read_partition(coin, month)
+                ts = arrays["timestamp"]
+                lo = 0 if start_ns is None else np.searchsorted(ts, start_ns, side="left")
+                hi = len(ts) if end_ns is None else np.searchsorted(ts, end_ns, side="right")
+                if hi <= lo:
+                    continue
+                names = [c for c in VALUE_COLUMNS if c in arrays and (wanted is None or c in wanted)]
+                chunk = {"timestamp": np.array(ts[lo:hi])}
+                chunk.update({c: np.array(arrays[c][lo:hi]) for c in names})
+                chunks.append(chunk)
+            if not chunks:
+                continue
+            names = list(dict.fromkeys(name for chunk in chunks for name in chunk))
+            yield coin, {
+                name: np.concatenate([
+                    chunk[name] if name in chunk else np.full(len(chunk["timestamp"]), np.nan)
+                    for chunk in chunks
+                ])
+                for name in names
+            }
+    
+    def load(self, coins=None, start=None, end=None, columns=None) -> pd.DataFrame:
+        """Load OHLCV for coins (default all) with start <= timestamp <= end.
+        
+        Only partitions overlapping the range are opened, and only the
+        matching rows are copied out of the memory-mapped arrays.
+        """
+        frames = []
+        for coin, arrays in self._load_arrays(coins, start, end, columns):
+            frame = pd.DataFrame(arrays)
+            frame["timestamp"] = frame["timestamp"].to_numpy().view("datetime64[ns]")
+            frame["coin"] = coin
+            frames.append(frame)
+        
+        if not frames:
+            return pd.DataFrame(columns=["timestamp", *VALUE_COLUMNS, "coin"])
+        return pd.concat(frames, ignore_index=True)
+    
+    def load_panel(self, coins=None, start=None, end=None, columns=None):
+        """Same selection as load(), pivoted into a data.panel.Panel without building a frame"""
+        from data.panel import Panel
+        
+        loaded = list(self._load_arrays(coins, start, end, columns))
+        names = [c for c in VALUE_COLUMNS if any(c in arrays for _, arrays in loaded)]
+        sizes = [len(arrays["timestamp"]) for _, arrays in loaded]
+        values = {
+            name: np.concatenate([arrays.get(name, np.full(size, np.nan)) for (_, arrays), size in zip(loaded, sizes)])
+            if loaded else np.empty(0)
+            for name in names
+        }
+        timestamps = np.concatenate([arrays["timestamp"] for _, arrays in loaded]) if loaded else np.empty(0, np.int64)
+        codes = np.repeat(np.arange(len(loaded)), sizes)
+        return Panel.from_columns([coin for coin, _ in loaded], codes, timestamps, values)
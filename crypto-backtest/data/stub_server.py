@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Stub CoinGecko Server - Local stand-in for the endpoints the fetcher uses
+
+Serves /coins/markets, /coins/{id}/market_chart and
+/coins/{id}/market_chart/range with deterministic synthetic data, plus
+optional latency and injected 429/500 responses, so the fetch pipeline
+can be exercised without touching the real API:
+
+    python data/stub_server.py --port 8765 --coins 500 --fail-rate 0.1
+    CryptoDataFetcher(base_url="http://127.0.0.1:8765", rate_limit=6000)
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+class StubState:
+    def __init__(self, coins=300, latency=0.0, fail_rate=0.0, seed=0, interval_ms=300_000):
+        self.coins = coins
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.interval_ms = interval_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = []  # (monotonic arrival time, path)
+        self.active = 0
+        self.peak_active = 0  # most requests in flight at once
+        self.failed = 0  # injected 429/500 responses
+    
+    def should_fail(self):
+        with self.lock:
+            fail = self.random.random() < self.fail_rate
+            self.failed += fail
+            return fail
+    
+    def market(self, rank):
+        rng = np.random.default_rng(rank)
+        price = float(10 ** rng.uniform(-8, 3))
+        return {
+            "id": f"coin-{rank}",
+            "symbol": f"c{rank}",
+            "name": f"Coin {rank}",
+            "current_price": price,
+            "market_cap": float(price * 10 ** rng.uniform(6, 12)),
+            "market_cap_rank": rank,
+            "total_volume": float(10 ** rng.uniform(3, 9)),
+        }
+    
+    def chart(self, coin_id, start_ms, end_ms):
+        ts = np.arange(start_ms - start_ms % self.interval_ms, end_ms + 1, self.interval_ms)
+        rng = np.random.default_rng(zlib.crc32(coin_id.encode()))
+        # Price is a deterministic function of time so overlapping ranges agree
+        base = rng.uniform(1e-6, 1.0)
+        prices = base * (1 + 0.05 * np.sin(ts / 3.6e6 / 7) + 0.01 * np.cos(ts / 3.6e6))
+        volumes = base * 1e9 * (1.5 + np.sin(ts / 3.6e6 / 3))
+        return {
+            "prices": [[int(t), float(p)] for t, p in zip(ts, prices)],
+            "total_volumes": [[int(t), float(v)] for t, v in zip(ts, volumes)],
+        }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        
+        def send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            with state.lock:
+                state.requests.append((time.monotonic(), url.path))
+                state.active += 1
+                state.peak_active = max(state.peak_active, state.active)
+            try:
+                self.respond(url, query)
+            finally:
+                with state.lock:
+                    state.active -= 1
+        
+        def respond(self, url, query):
+            if state.latency:
+                time.sleep(state.latency)
+            if state.should_fail():
+                status = state.random.choice([429, 500])
+                return self.send_json(status, {"error": "injected"}, {"Retry-After": "0"} if status == 429 else None)
+            
+            parts = url.path.strip("/").split("/")
+            if parts == ["coins", "markets"]:
+                per_page = int(query.get("per_page", 100))
+                page = int(query.get("page", 1))
+                first = (page - 1) * per_page + 1
+                ranks = range(first, min(state.coins, first + per_page - 1) + 1)
+                return self.send_json(200, [state.market(r) for r in ranks])
+            if len(parts) == 3 and parts[0] == "coins" and parts[2] == "market_chart":
+                end_ms = int(time.time() * 1000)
+                start_ms = end_ms - int(float(query.get("days", 1)) * 86_400_000)
+                return self.send_json(200, state.chart(parts[1], start_ms, end_ms))
+            if len(parts) == 4 and parts[0] == "coins" and parts[2:] == ["market_chart", "range"]:
+                start_ms = int(query["from"]) * 1000
+                end_ms = int(query["to"]) * 1000
+                return self.send_json(200, state.chart(parts[1], start_ms, end_ms))
+            return self.send_json(404, {"error": "not found"})
+    
+    return Handler
+
+
+def start_stub_server(port=0, **options):
+    """Start the stub in a background thread; returns (server, base_url)"""
+    state = StubState(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--coins", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server, base_url = start_stub_server(args.port, coins=args.coins, latency=args.latency, fail_rate=args.fail_rate)
+    print(f"Stub CoinGecko API on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
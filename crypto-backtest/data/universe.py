@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Universe Screener - Cached, paginated snapshots of the whole coin market list
+
+A refresh pages through /coins/markets until a short page marks the end.
+It requests max_concurrency pages at a time through the fetcher, whose
+token bucket keeps the overall request rate under the limit. The pages
+are written to SQLite as one snapshot. Screens (price ceiling, minimum
+volume, market-cap band) are then SQL queries against the latest
+snapshot, served from indexes, so they need no network. A snapshot is
+reused until it is older than ttl seconds, so building the universe
+takes one network pass per day rather than one per run.
+"""
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+UNIVERSE_DB = os.path.join(DATA_DIR, "universe.db")
+TTL = 24 * 60 * 60
+PER_PAGE = 250  # the API maximum
+
+MARKET_COLUMNS = ("id", "symbol", "name", "current_price", "market_cap", "market_cap_rank", "total_volume")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    vs_currency TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    coins INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots (vs_currency, fetched_at);
+CREATE TABLE IF NOT EXISTS markets (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    symbol TEXT, name TEXT,
+    current_price REAL, market_cap REAL, market_cap_rank INTEGER, total_volume REAL,
+    PRIMARY KEY (snapshot_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS markets_price ON markets (snapshot_id, current_price);
+CREATE INDEX IF NOT EXISTS markets_volume ON markets (snapshot_id, total_volume);
+CREATE INDEX IF NOT EXISTS markets_cap ON markets (snapshot_id, market_cap);
+"""
+
+
+class UniverseScreener:
+    def __init__(self, fetcher, path=UNIVERSE_DB, ttl=TTL, vs_currency="usd", per_page=PER_PAGE,
+                 max_pages=None, keep=2):
+        """fetcher is a CryptoDataFetcher; keep is how many snapshots are retained"""
+        self.fetcher = fetcher
+        self.path = path
+        self.ttl = ttl
+        self.vs_currency = vs_currency
+        self.per_page = per_page
+        self.max_pages = max_pages
+        self.keep = keep
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def latest(self) -> Optional[Dict]:
+        """Newest snapshot {id, fetched_at, coins}, or None"""
+        row = self.conn.execute(
+            "SELECT id, fetched_at, coins FROM snapshots WHERE vs_currency = ? ORDER BY fetched_at DESC LIMIT 1",
+            (self.vs_currency,)).fetchone()
+        return dict(row) if row else None
+
+    def is_fresh(self, snapshot, now=None) -> bool:
+        now = time.time() if now is None else now
+        return snapshot is not None and now - snapshot["fetched_at"] < self.ttl
+
+    def _page(self, page) -> List[Dict]:
+        return self.fetcher.get_coin_market_data(vs_currency=self.vs_currency, per_page=self.per_page, page=page)
+
+    def fetch_markets(self) -> List[Dict]:
+        """Every page of the market list, in rank order.
+
+        Pages go out max_concurrency at a time; the first wave with a short
+        page is the last one, so at most max_concurrency - 1 requests past
+        the end are wasted.
+        """
+        concurrency = max(1, self.fetcher.max_concurrency)
+        markets, page, done = [], 1, False
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while not done:
+                wave = range(page, page + concurrency)
+                if self.max_pages is not None:
+                    wave = range(page, min(page + concurrency, self.max_pages + 1))
+                for rows in pool.map(self._page, wave):
+                    if done:
+                        continue
+                    markets.extend(rows)
+                    done = len(rows) < self.per_page
+                page += concurrency
+                if self.max_pages is not None and page > self.max_pages:
+                    done = True
+        return markets
+
+    def refresh(self, force=False, now=None) -> Dict:
+        """Latest snapshot, fetching a new one if it's missing, older than ttl, or force is set.
+
+        If the fetch fails and an older snapshot exists, that one is
+        returned instead (with a warning) rather than failing the run.
+        """
+        snapshot = self.latest()
+        if not force and self.is_fresh(snapshot, now):
+            return snapshot
+        try:
+            markets = self.fetch_markets()
+        except Exception as e:
+            if snapshot is None:
+                raise
+            print(f"Universe refresh failed ({e}); using snapshot from {time.ctime(snapshot['fetched_at'])}")
+            return snapshot
+        return self.write(markets, now)
+
+    def write(self, markets, now=None) -> Dict:
+        """Store markets as a new snapshot and drop all but the newest `keep`"""
+        fetched_at = time.time() if now is None else now
+        # Ranks can shift between pages while paging; keep one row per coin
+        rows = {m["id"]: tuple(m.get(col) for col in MARKET_COLUMNS) for m in markets if m.get("id")}
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO snapshots (vs_currency, fetched_at, coins) VALUES (?, ?, ?)",
+                (self.vs_currency, fetched_at, len(rows)))
+            snapshot_id = cursor.lastrowid
+            self.conn.executemany(
+                f"INSERT INTO markets (snapshot_id, {', '.join(MARKET_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(MARKET_COLUMNS))})",
+                ((snapshot_id,) + row for row in rows.values()))
+            self.conn.execute(
+                "DELETE FROM snapshots WHERE vs_currency = ? AND id NOT IN "
+                "(SELECT id FROM snapshots WHERE vs_currency = ? ORDER BY fetched_at DESC LIMIT ?)",
+                (self.vs_currency, self.vs_currency, self.keep))
+        return {"id": snapshot_id, "fetched_at": fetched_at, "coins": len(rows)}
+
+    def screen(self, max_price=None, min_price=None, min_volume=None, min_market_cap=None, max_market_cap=None,
+               limit=None, refresh=True, now=None) -> List[Dict]:
+        """Coins in the latest snapshot passing every given bound, by market-cap rank.
+
+        With refresh (the default) a stale or missing snapshot is fetched
+        first; otherwise whatever is stored is screened.
+        """
+        snapshot = self.refresh(now=now) if refresh else self.latest()
+        if snapshot is None:
+            return []
+        clauses, args = ["snapshot_id = ?"], [snapshot["id"]]
+        for column, op, value in (("current_price", "<=", max_price), ("current_price", ">=", min_price),
+                                  ("total_volume", ">=", min_volume), ("market_cap", ">=", min_market_cap),
+                                  ("market_cap", "<=", max_market_cap)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                args.append(value)
+        query = (f"SELECT {', '.join(MARKET_COLUMNS)} FROM markets WHERE {' AND '.join(clauses)} "
+                 "ORDER BY market_cap_rank IS NULL, market_cap_rank, id")
+        if limit is not None:
+            query += " LIMIT ?"
+            args.append(limit)
+        return [dict(row) for row in self.conn.execute(query, args)]
@@ -1,13 +1,12 @@
 #!/usr/bin/env python3
 """
 Results Display - Format and display backtest results
-"""
 
-import json
-import os
-from datetime import datetime
+The command line for these is `python run.py results [STRATEGY]` and
+`python run.py compare [STRATEGY]`.
+"""
 
-RESULTS_DIR = "results"
+from results.store import ResultsStore
 
 def format_currency(amount):
     """Format as USD"""
@@ -31,6 +30,8 @@ def display_metrics(metrics):
     print(f"  Total P&L:       {format_currency(metrics['total_pnl'])}")
     print(f"  Return:          {format_percent(metrics.get('return_pct', 0))}")
     print(f"  Final Balance:   {format_currency(metrics.get('final_balance', 0))}")
+    if metrics.get("total_fees"):
+        print(f"  Fees Paid:       {format_currency(metrics['total_fees'])}")
     
     print(f"\n✅ WINNING TRADES")
     print(f"  Count:           {metrics['profitable']}")
@@ -42,6 +43,16 @@ def display_metrics(metrics):
     print(f"  Avg Loss:        {format_currency(metrics.get('avg_loss', 0))}")
     print(f"  Max Loss:        {format_currency(metrics.get('max_loss', 0))}")
     
+    if "sharpe" in metrics:
+        profit_factor = metrics.get("profit_factor")
+        print(f"\n📉 RISK")
+        print(f"  Max Drawdown:    {format_percent(metrics['max_drawdown_pct'])} over {metrics['max_drawdown_bars']} bars")
+        print(f"  Sharpe:          {metrics['sharpe']:.2f}")
+        print(f"  Sortino:         {metrics['sortino']:.2f}")
+        print(f"  Profit Factor:   {'n/a' if profit_factor is None else f'{profit_factor:.2f}'}")
+        print(f"  Expectancy:      {format_currency(metrics['expectancy'])}")
+        print(f"  Time in Market:  {metrics['time_in_market_pct']:.1f}%")
+    
     print("\n" + "="*50)
 
 def display_trade_list(trades, limit=10):
@@ -59,22 +70,23 @@ def display_trade_list(trades, limit=10):
         print(f"{t['coin']:<10} ${t['entry']:>8.4f} ${t['exit']:>8.4f} {format_currency(t['pnl']):>12} {format_percent(t['pnl_pct']):>8}")
 
 
-def load_results(strategy_name=None):
-    """Load results from files"""
-    os.makedirs(RESULTS_DIR, exist_ok=True)
-    
-    files = [f for f in os.listdir(RESULTS_DIR) if f.endswith(".json")]
-    if strategy_name:
-        files = [f for f in files if strategy_name in f]
-    
-    files.sort(reverse=True)
-    
-    results = []
-    for f in files:
-        with open(os.path.join(RESULTS_DIR, f)) as fp:
-            results.append(json.load(fp))
-    
-    return results
+def load_results(strategy_name=None, limit=None):
+    """Run summaries, newest first, from the results index (new JSON files are imported first)"""
+    store = ResultsStore()
+    try:
+        store.import_json()
+        return store.summaries(strategy_name, limit=limit)
+    finally:
+        store.close()
+
+
+def load_trades(run_id):
+    """Trade list of one indexed run"""
+    store = ResultsStore()
+    try:
+        return store.trades(run_id)
+    finally:
+        store.close()
 
 def compare_strategies(results):
     """Compare multiple strategy results"""
@@ -94,31 +106,3 @@ def compare_strategies(results):
     
     print("="*70)
 
-
-# CLI interface
-if __name__ == "__main__":
-    import sys
-    
-    if len(sys.argv) < 2:
-        # Show latest results
-        results = load_results()
-        if results:
-            latest = results[0]
-            display_metrics(latest["metrics"])
-            display_trade_list(latest["metrics"].get("trades", []))
-        else:
-            print("No results found.")
-    elif sys.argv[1] == "list":
-        results = load_results()
-        compare_strategies(results)
-    elif sys.argv[1] == "compare":
-        results = load_results()
-        compare_strategies(results)
-    else:
-        # Show specific strategy
-        results = load_results(sys.argv[1])
-        if results:
-            latest = results[0]
-            display_metrics(latest["metrics"])
-        else:
-            print(f"No results for {sys.argv[1]}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Results Store - SQLite index of backtest runs
+
+One `runs` row per result holds the strategy, timestamp, canonical params
+JSON and the summary metrics (with the usual ones as columns), indexed
+by strategy/timestamp and params. Trades go to a separate `trades` table
+keyed by run and are only read when asked for, so listing and comparing
+runs never touches trade detail. JSON result files are imported once,
+keyed by their path under results/ (see source_key).
+"""
+
+import json
+import os
+import sqlite3
+from typing import Dict, List, Optional
+
+RESULTS_DIR = "results"
+DB_PATH = os.path.join(RESULTS_DIR, "results.db")
+JSON_DIRS = (RESULTS_DIR, os.path.join(RESULTS_DIR, "json"))
+
+SUMMARY_COLUMNS = ("total_trades", "win_rate", "total_pnl", "return_pct", "final_balance",
+                   "max_drawdown_pct", "sharpe")
+TRADE_COLUMNS = ("coin", "entry", "exit", "pnl", "pnl_pct", "entry_time", "exit_time",
+                 "entry_idx", "exit_idx", "fees", "exit_reason")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    strategy TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    params TEXT NOT NULL,
+    source TEXT UNIQUE,
+    metrics TEXT NOT NULL,
+    {", ".join(f"{col} REAL" for col in SUMMARY_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS runs_strategy_time ON runs (strategy, timestamp);
+CREATE INDEX IF NOT EXISTS runs_time ON runs (timestamp);
+CREATE INDEX IF NOT EXISTS runs_params ON runs (strategy, params);
+CREATE TABLE IF NOT EXISTS trades (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    coin TEXT, entry REAL, exit REAL, pnl REAL, pnl_pct REAL,
+    entry_time TEXT, exit_time TEXT, entry_idx INTEGER, exit_idx INTEGER,
+    fees REAL, exit_reason TEXT,
+    PRIMARY KEY (run_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+def canonical_params(params) -> str:
+    """Params as key-sorted JSON, so equal params index to equal text"""
+    return json.dumps(params or {}, sort_keys=True, default=str)
+
+
+def source_key(path) -> str:
+    """How a result file is identified in the index: its path relative to RESULTS_DIR, with / separators"""
+    return os.path.relpath(path, RESULTS_DIR).replace(os.sep, "/")
+
+
+class ResultsStore:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, result: Dict, source: Optional[str] = None) -> int:
+        """Index one result ({strategy, params, timestamp, metrics[, trades]}); returns its run id"""
+        metrics = dict(result["metrics"])
+        trades = metrics.pop("trades", None) or []
+        columns = ("strategy", "timestamp", "params", "source", "metrics") + SUMMARY_COLUMNS
+        values = (result["strategy"], result["timestamp"], canonical_params(result.get("params")), source,
+                  json.dumps(metrics)) + tuple(metrics.get(col) for col in SUMMARY_COLUMNS)
+        with self.conn:
+            if source is not None:
+                # A rewritten file replaces its earlier run
+                self.conn.execute("DELETE FROM runs WHERE source = ?", (source,))
+            cursor = self.conn.execute(
+                f"INSERT INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", values)
+            run_id = cursor.lastrowid
+            self.conn.executemany(
+                f"INSERT INTO trades (run_id, seq, {', '.join(TRADE_COLUMNS)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(TRADE_COLUMNS))})",
+                ((run_id, seq) + tuple(trade.get(col) for col in TRADE_COLUMNS) for seq, trade in enumerate(trades)),
+            )
+        return run_id
+
+    def sources(self) -> set:
+        return {row[0] for row in self.conn.execute("SELECT source FROM runs WHERE source IS NOT NULL")}
+
+    def import_json(self, directories=JSON_DIRS) -> int:
+        """Index result JSON files not seen before (by source_key); returns how many were added"""
+        self._migrate_sources(directories)
+        known = self.sources()
+        added = 0
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                path = os.path.join(directory, name)
+                key = source_key(path)
+                if not name.endswith(".json") or key in known:
+                    continue
+                with open(path) as f:
+                    result = json.load(f)
+                if not isinstance(result, dict) or "metrics" not in result:
+                    continue
+                self.add(result, source=key)
+                known.add(key)
+                added += 1
+        return added
+
+    def _migrate_sources(self, directories):
+        """Rekey runs indexed by bare file name (older indexes) whose file lives in a subdirectory"""
+        known = self.sources()
+        with self.conn:
+            for directory in directories:
+                if not os.path.isdir(directory):
+                    continue
+                for name in os.listdir(directory):
+                    key = source_key(os.path.join(directory, name))
+                    if key != name and name in known and key not in known \
+                            and not os.path.exists(os.path.join(RESULTS_DIR, name)):
+                        self.conn.execute("UPDATE runs SET source = ? WHERE source = ?", (key, name))
+                        known.discard(name)
+                        known.add(key)
+
+    def summaries(self, strategy=None, params=None, limit=None) -> List[Dict]:
+        """Runs newest first, with summary metrics only"""
+        query = "SELECT id, strategy, timestamp, params, metrics FROM runs"
+        clauses, args = [], []
+        if strategy is not None:
+            clauses.append("strategy = ?")
+            args.append(strategy)
+        if params is not None:
+            clauses.append("params = ?")
+            args.append(canonical_params(params))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY timestamp DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            args.append(limit)
+        return [
+            {
+                "id": row["id"],
+                "strategy": row["strategy"],
+                "timestamp": row["timestamp"],
+                "params": json.loads(row["params"]),
+                "metrics": json.loads(row["metrics"]),
+            }
+            for row in self.conn.execute(query, args)
+        ]
+
+    def latest(self, strategy=None) -> Optional[Dict]:
+        runs = self.summaries(strategy, limit=1)
+        return runs[0] if runs else None
+
+    def trades(self, run_id) -> List[Dict]:
+        """A run's trades, in the order they were recorded"""
+        rows = self.conn.execute(
+            f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades WHERE run_id = ? ORDER BY seq", (run_id,))
+        return [{col: row[col] for col in TRADE_COLUMNS if row[col] is not None} for row in rows]
@@ -1,24 +1,33 @@
 #!/usr/bin/env python3
 """
 Main runner for crypto backtesting
+
+    python run.py fetch | universe | ingest | backtest | sweep | walkforward | montecarlo | replay
+    python run.py results | compare | cache
+    python run.py <command> --help
+
+Commands import what they use when they run, so read-only commands such
+as results, compare and cache start without loading pandas, the engine
+or the HTTP client.
+
+backtest, sweep and walkforward reuse cached results and indicators for
+unchanged data, strategy and engine settings; pass --no-cache to recompute.
 """
 
+import argparse
 import sys
 import os
-import pandas as pd
+import time
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from data.data_fetcher import CryptoDataFetcher
-from backtest.engine import BacktestEngine
-from strategies.base import get_strategy
-from results.display import display_metrics, display_trade_list, load_results, compare_strategies
-
 
-def fetch_data():
-    fetcher = CryptoDataFetcher()
-    print("Fetching cheap coins...")
-    cheap = fetcher.get_cheap_coins(max_price=0.01, limit=10)
+def fetch_data(bar_size="1h", refresh=False):
+    from data.data_fetcher import CryptoDataFetcher
+    
+    fetcher = CryptoDataFetcher(bar_size=bar_size)
+    print("Screening cheap coins...")
+    cheap = fetcher.get_cheap_coins(max_price=0.01, limit=10, refresh=refresh)
     coin_ids = [c["id"] for c in cheap[:5]]
     print(f"Fetching data for: {coin_ids}")
     df = fetcher.fetch_and_save(coin_ids, days=30)
@@ -26,9 +35,59 @@ def fetch_data():
         print(f"Fetched {len(df)} rows of data")
     else:
         print("No data fetched")
+    print(f"Requests: {fetcher.stats.summary()}")
+
 
+def screen_universe(refresh=False, limit=50, **bounds):
+    """Print coins from the cached market snapshot that pass the given bounds (see data.universe)"""
+    from data.data_fetcher import CryptoDataFetcher
+    from data.universe import UniverseScreener
+    
+    fetcher = CryptoDataFetcher()
+    screener = UniverseScreener(fetcher)
+    try:
+        snapshot = screener.refresh(force=refresh)
+        coins = screener.screen(limit=limit, refresh=False, **bounds)
+    finally:
+        screener.close()
+    age = (time.time() - snapshot["fetched_at"]) / 3600
+    print(f"Snapshot of {snapshot['coins']} coins, {age:.1f}h old ({fetcher.stats.summary()['requests']} requests)")
+    print(f"{'Rank':>6} {'Coin':<28} {'Price':>14} {'Volume':>16} {'Market cap':>16}")
+    for c in coins:
+        rank = c["market_cap_rank"] if c["market_cap_rank"] is not None else "-"
+        print(f"{rank:>6} {c['id']:<28} {c['current_price'] or 0:>14.8g} {c['total_volume'] or 0:>16,.0f} "
+              f"{c['market_cap'] or 0:>16,.0f}")
+    print(f"{len(coins)} coins")
 
-def run_backtest(strategy_name="rsi_v3", **strategy_params):
+
+def load_data(coins=None, start=None, end=None, timeframe=None):
+    """Load market data; returns (df, source) or (None, None).
+    
+    Reads the requested coins/date range from the market data store, and
+    falls back to the latest CSV file when the store is empty. With a
+    timeframe, bars are resampled from the stored granularity.
+    """
+    import pandas as pd
+    from data.bars import BarCache, shared_cache
+    from data.store import MarketDataStore
+    
+    store = MarketDataStore()
+    if store.coins():
+        if timeframe:
+            try:
+                df = shared_cache(store).load(coins=coins, timeframe=timeframe, start=start, end=end)
+            except ValueError as e:
+                print(f"Cannot load {timeframe} bars: {e}")
+                return None, None
+        else:
+            df = store.load(coins=coins, start=start, end=end)
+        if len(df) == 0:
+            print("No data in the store for that selection.")
+            return None, None
+        print(f"Loaded {len(df)} rows from {store.root}")
+        print(f"Coins: {df['coin'].unique()}")
+        return df, "store"
+    
     data_dir = "data"
     files = [f for f in os.listdir(data_dir) if f.endswith(".csv")]
     ohlcv_files = [f for f in files if "ohlcv" in f]
@@ -37,61 +96,541 @@ def run_backtest(strategy_name="rsi_v3", **strategy_params):
     
     if not files:
         print("No data found. Run 'python run.py fetch' first.")
-        return
+        return None, None
     
     latest_file = sorted(files)[-1]
     df = pd.read_csv(os.path.join(data_dir, latest_file))
     df["timestamp"] = pd.to_datetime(df["timestamp"])
+    if coins is not None:
+        df = df[df["coin"].isin(coins)].reset_index(drop=True)
+    if start is not None:
+        df = df[df["timestamp"] >= pd.Timestamp(start)].reset_index(drop=True)
+    if end is not None:
+        df = df[df["timestamp"] <= pd.Timestamp(end)].reset_index(drop=True)
+    if timeframe:
+        try:
+            df = BarCache(df).load(timeframe=timeframe)
+        except ValueError as e:
+            print(f"Cannot load {timeframe} bars: {e}")
+            return None, None
     
     print(f"Loaded {len(df)} rows from {latest_file}")
     print(f"Coins: {df['coin'].unique()}")
+    return df, latest_file
+
+
+def load_panel(coins=None, start=None, end=None, timeframe=None):
+    """Like load_data, pivoted into a timestamp x coin Panel; returns (panel, source) or (None, None)"""
+    from data.panel import Panel
+    from data.store import MarketDataStore
     
-    strategy = get_strategy(strategy_name, **strategy_params)
-    position_size = strategy.get_position_size()
-    print(f"Running {strategy.name} with position_size={position_size}")
+    store = MarketDataStore()
+    if store.coins() and not timeframe:
+        panel = store.load_panel(coins=coins, start=start, end=end)
+        if not len(panel):
+            print("No data in the store for that selection.")
+            return None, None
+        print(f"Loaded {panel.shape[0]} bars x {panel.shape[1]} coins from {store.root}")
+        return panel, "store"
     
-    engine = BacktestEngine(initial_balance=1000)
+    df, source = load_data(coins, start, end, timeframe)
+    if df is None:
+        return None, None
+    return Panel.from_frame(df), source
+
+
+def ingest_csv(path):
+    """Import a CSV of OHLCV rows into the market data store"""
+    import pandas as pd
+    from data.store import MarketDataStore
+    
+    df = pd.read_csv(path)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    store = MarketDataStore()
+    rows = store.write(df)
+    print(f"Stored {rows} rows for {df['coin'].nunique()} coins in {store.root}")
+
+
+def run_backtest(strategy_name="rsi_v3", vectorized=False, workers=None, data_range=None,
+                 max_positions=None, profile=False, cprofile_path=None, execution=None, use_cache=True,
+                 **strategy_params):
+    from backtest.cache import ENGINE_MODULES, DiskCache, code_digest, digest, frame_digest, strategy_identity
+    from backtest.engine import BacktestEngine
+    from backtest.profiling import Profiler
+    from results.display import display_metrics, display_trade_list
+    from strategies.base import get_strategy
+    from strategies.cross_section import CROSS_SECTIONAL
+    
+    if strategy_name in CROSS_SECTIONAL:
+        return run_cross_sectional(strategy_name, data_range, execution, **strategy_params)
+    
+    profiler = Profiler(enabled=profile or bool(cprofile_path), cprofile_path=cprofile_path)
+    if profiler.enabled and workers:
+        print("Profiling runs in-process; ignoring --workers")
+        workers = None
+    
+    with profiler.cprofile():
+        with profiler.phase("load"):
+            df, latest_file = load_data(**(data_range or {}))
+        if df is None:
+            return
+        
+        strategy = get_strategy(strategy_name, **strategy_params)
+        position_size = strategy.get_position_size()
+        print(f"Running {strategy.name} with position_size={position_size}")
+        
+        engine = BacktestEngine(initial_balance=1000, execution=execution)
+        if engine.execution.params():
+            print(f"Execution: {engine.execution}")
+        params = {"data_file": latest_file, "position_size": position_size}
+        if engine.execution.params():
+            params["execution"] = engine.execution.params()
+        
+        # Profiling measures a real run, so it never reads the cache
+        cache = DiskCache() if use_cache and not profiler.enabled else None
+        if cache is not None:
+            mode = f"portfolio:{max_positions}" if max_positions else "signals" if vectorized else "rows"
+            settings = {"initial_balance": engine.initial_balance, "execution": engine.execution.params(),
+                        "mode": mode, "position_size": position_size}
+            key = digest("backtest", frame_digest(df), code_digest(*ENGINE_MODULES, type(strategy).__module__),
+                         strategy_identity(strategy), settings)
+            if show_cached(cache, key, strategy.name, params):
+                return
+        profiler.instrument_run(strategy, engine)
+        
+        try:
+            with profiler.phase("engine"):
+                if max_positions:
+                    print(f"Portfolio mode: shared balance, max {max_positions} open positions")
+                    metrics = engine.run_portfolio(df, strategy, max_positions=max_positions, position_size=position_size)
+                elif vectorized:
+                    metrics = engine.run_signals(df, strategy, position_size, workers=workers)
+                else:
+                    metrics = engine.run(df, strategy.entry_condition, strategy.exit_condition, position_size,
+                                         workers=workers, risk=strategy.risk())
+        finally:
+            profiler.restore()
+        
+        display_metrics(metrics)
+        display_trade_list(metrics.get("trades", []))
+        
+        with profiler.phase("save"):
+            filename, metrics = engine.save_results(strategy.name, params)
+            if cache is not None:
+                cache.put_json("results", key, {"metrics": metrics, "file": os.path.basename(filename)})
+        print(f"\nResults saved to {filename}")
     
-    metrics = engine.run(
-        df, 
-        lambda row: strategy.entry_condition(df, df[df["timestamp"] == row["timestamp"]].index[0]),
-        lambda row, trade: strategy.exit_condition(df, df[df["timestamp"] == row["timestamp"]].index[0], trade),
-        position_size
-    )
+    if profiler.enabled:
+        print(profiler.report(bars=len(df)))
+
+
+def show_cached(cache, key, strategy_name, params) -> bool:
+    """Display a cached backtest result, if there is one, instead of rerunning it.
+    
+    The result is only saved again if its original JSON file was deleted,
+    so unchanged reruns don't pile up duplicate result files.
+    """
+    from backtest.engine import RESULTS_DIR, save_result
+    from results.display import display_metrics, display_trade_list
+    
+    cached = cache.get_json("results", key)
+    if cached is None:
+        return False
+    metrics = cached["metrics"]
+    display_metrics(metrics)
+    display_trade_list(metrics.get("trades", []))
+    path = os.path.join(RESULTS_DIR, cached["file"])
+    if os.path.exists(path):
+        print(f"\nUnchanged since {path} (cached); not saved again. Use --no-cache to rerun.")
+    else:
+        filename = save_result(strategy_name, params, metrics)
+        cache.put_json("results", key, {"metrics": metrics, "file": os.path.basename(filename)})
+        print(f"\nResults saved to {filename} (cached)")
+    return True
+
+
+def run_cross_sectional(strategy_name, data_range=None, execution=None, **strategy_params):
+    """Backtest a strategies.cross_section strategy over the whole universe as one panel"""
+    from backtest.engine import BacktestEngine
+    from results.display import display_metrics, display_trade_list
+    from strategies.cross_section import CROSS_SECTIONAL
+    
+    panel, source = load_panel(**(data_range or {}))
+    if panel is None:
+        return
     
+    strategy = CROSS_SECTIONAL[strategy_name](**strategy_params)
+    position_size = strategy.get_position_size()
+    print(f"Running {strategy.name} over {len(panel.coins)} coins with position_size={position_size:.3f}")
+    
+    engine = BacktestEngine(initial_balance=1000, execution=execution)
+    metrics = engine.run_cross_section(panel, strategy, position_size)
     display_metrics(metrics)
     display_trade_list(metrics.get("trades", []))
     
-    filename, _ = engine.save_results(strategy.name, {"data_file": latest_file, "position_size": position_size})
+    params = {**strategy.params, "data_file": source, "position_size": position_size}
+    if engine.execution.params():
+        params["execution"] = engine.execution.params()
+    filename, _ = engine.save_results(strategy.name, params)
+    print(f"\nResults saved to {filename}")
+
+
+def run_sweep(strategy_name, ranges, workers=None, rank_by="return_pct", data_range=None, use_cache=True):
+    from backtest.cache import DiskCache
+    from backtest.sweep import run_sweep as sweep, save_sweep
+    
+    df, _ = load_data(**(data_range or {}))
+    if df is None:
+        return
+    
+    table = sweep(df, strategy_name, ranges, workers=workers, rank_by=rank_by,
+                  cache=DiskCache() if use_cache else None)
+    print(f"\nTop combinations by {rank_by} ({len(table)} run):")
+    print(table.head(20).to_string(index=False))
+    
+    filename = save_sweep(table, strategy_name)
     print(f"\nResults saved to {filename}")
 
 
-def show_results():
-    results = load_results()
+def run_walkforward(strategy_names, ranges=None, train_bars=90, test_bars=30, step=None, workers=None,
+                    rank_by="return_pct", data_range=None, use_cache=True):
+    import pandas as pd
+    from backtest.cache import DiskCache
+    from backtest.walkforward import run_walkforward as walkforward, save_walkforward
+    
+    df, _ = load_data(**(data_range or {}))
+    if df is None:
+        return
+    
+    summary = []
+    for name in strategy_names:
+        try:
+            table, metrics = walkforward(df, name, ranges, train_bars, test_bars, step, workers=workers,
+                                         rank_by=rank_by, cache=DiskCache() if use_cache else None)
+        except ValueError as e:
+            print(f"\nCannot walk forward {name}: {e}")
+            continue
+        print(f"\n{name}: {len(table)} folds (train {train_bars} / test {test_bars} bars), best by {rank_by}")
+        print(table.to_string(index=False))
+        print(f"Results saved to {save_walkforward(table, name)}")
+        summary.append({"strategy": name, **{k: v for k, v in metrics.items() if k != "trades"}})
+    
+    if not summary:
+        return
+    print("\nOUT-OF-SAMPLE (test windows stitched)")
+    columns = ["strategy", "total_trades", "win_rate", "return_pct", "max_drawdown_pct", "sharpe", "profit_factor"]
+    print(pd.DataFrame(summary)[columns].to_string(index=False))
+
+
+def run_montecarlo(strategy_name="rsi_v3", n_sims=1000, methods=None, block_size=10, seed=0, workers=None,
+                   data_range=None, **strategy_params):
+    from backtest.montecarlo import METHODS, run_montecarlo as montecarlo, save_montecarlo
+    from strategies.base import get_strategy
+    
+    df, _ = load_data(**(data_range or {}))
+    if df is None:
+        return
+    
+    strategy = get_strategy(strategy_name, **strategy_params)
+    report = montecarlo(df, strategy, methods or METHODS, n_sims, seed, workers, block_size)
+    observed = report["observed"]
+    print(f"\n{strategy.name}: observed return {observed['return_pct']:+.2f}%, "
+          f"max drawdown {observed['max_drawdown_pct']:.2f}% (trade path {observed['trade_max_drawdown_pct']:.2f}%)")
+    print(f"{'Method':<10} {'Sims':>6} {'Return p5':>10} {'p50':>8} {'p95':>8} {'MaxDD p5':>10} {'p50':>8} {'p95':>8} {'P(loss)':>8}")
+    for method, dist in report["distributions"].items():
+        ret, dd = dist["return_pct"], dist["max_drawdown_pct"]
+        print(f"{method:<10} {dist['simulations']:>6} {ret['p5']:>+9.2f}% {ret['p50']:>+7.2f}% {ret['p95']:>+7.2f}% "
+              f"{dd['p5']:>9.2f}% {dd['p50']:>7.2f}% {dd['p95']:>7.2f}% {dist['prob_loss']:>7.1%}")
+    print(f"\nResults saved to {save_montecarlo(report)}")
+
+
+def run_replay(strategy_name="rsi_v3", path=None, data_range=None, **strategy_params):
+    """Stream bars through the engine one at a time: a CSV file as read, or the data backtest would load"""
+    from backtest.engine import BacktestEngine
+    from data.replay import replay_csv, replay_frame
+    from results.display import display_metrics, display_trade_list
+    from strategies.base import get_strategy
+    
+    if path is not None:
+        bars, source = replay_csv(path), path
+    else:
+        df, source = load_data(**(data_range or {}))
+        if df is None:
+            return
+        bars = replay_frame(df)
+    
+    strategy = get_strategy(strategy_name, **strategy_params)
+    print(f"Replaying {source} through {strategy.name}")
+    engine = BacktestEngine(initial_balance=1000)
+    metrics = engine.run_stream(bars, strategy)
+    display_metrics(metrics)
+    display_trade_list(metrics.get("trades", []))
+
+
+def show_results(strategy_name=None, trades=10):
+    """Latest run (of one strategy, if given) with its last trades"""
+    from results.display import display_metrics, display_trade_list, load_results, load_trades
+    
+    results = load_results(strategy_name, limit=1)
     if results:
         latest = results[0]
+        print(f"{latest['strategy']} at {latest['timestamp']}")
         display_metrics(latest["metrics"])
-        display_trade_list(latest["metrics"].get("trades", []))
+        display_trade_list(load_trades(latest["id"]), limit=trades)
+    elif strategy_name:
+        print(f"No results for {strategy_name}")
     else:
         print("No results found.")
 
 
-def compare_results():
-    results = load_results()
-    compare_strategies(results)
+def compare_results(strategy_name=None, limit=None):
+    from results.display import compare_strategies, load_results
+    
+    compare_strategies(load_results(strategy_name, limit=limit))
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print(__doc__)
-    elif sys.argv[1] == "fetch":
-        fetch_data()
-    elif sys.argv[1] == "backtest":
-        strategy = sys.argv[2] if len(sys.argv) > 2 else "rsi_v3"
-        run_backtest(strategy)
-    elif sys.argv[1] == "results":
-        show_results()
-    elif sys.argv[1] == "compare":
-        compare_results()
+def cache_command(action=None, kind=None):
+    """Show the result cache's size, or clear it (optionally one kind of entry)"""
+    from backtest.cache import DiskCache
+    
+    cache = DiskCache()
+    if action == "clear":
+        removed = cache.clear(kind)
+        print(f"Removed {removed['files']} cached files ({removed['bytes'] / 2**20:.1f} MB) from {cache.root}")
+        return
+    stats = cache.stats()
+    print(f"{cache.root}: {stats['files']} files, {stats['bytes'] / 2**20:.1f} MB "
+          f"(limit {cache.max_bytes / 2**20:.0f} MB)")
+    for kind, (count, size) in sorted(stats["kinds"].items()):
+        print(f"  {kind:<12} {count:>6} files {size / 2**20:>8.1f} MB")
+
+
+# Metrics sweeps and walk-forward folds can rank by: backtest.sweep.SUMMARY_KEYS, spelled out
+# here so building the parser doesn't import pandas and the engine
+RANK_METRICS = ("total_trades", "win_rate", "total_pnl", "avg_profit", "avg_loss", "return_pct",
+                "max_drawdown_pct", "sharpe", "sortino", "profit_factor")
+
+
+def parse_value(text):
+    """Param value from the command line: int, float, true/false/none, or else the string"""
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered == "none":
+        return None
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_param(text):
+    """"name=value" -> (name, value)"""
+    name, sep, value = text.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected name=value, got {text!r}")
+    return name, parse_value(value)
+
+
+def parse_range_arg(text):
+    """"name=start:stop:step" or "name=a,b,c" -> (name, [values])"""
+    from backtest.sweep import parse_range
+    
+    name, sep, spec = text.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected name=start:stop:step or name=a,b,c, got {text!r}")
+    try:
+        return name, parse_range(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def check_params(parser, strategy_name, names, cross_sectional=False):
+    """Exit with a usage error if the strategy is unknown or any of names isn't one of its params"""
+    from strategies.base import STRATEGIES
+
+    registry = dict(STRATEGIES)
+    if cross_sectional:
+        from strategies.cross_section import CROSS_SECTIONAL
+        registry.update(CROSS_SECTIONAL)
+    if strategy_name not in registry:
+        parser.error(f"unknown strategy {strategy_name!r} (choose from {', '.join(registry)})")
+    known = registry[strategy_name]().params
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        parser.error(f"unknown param(s) for {strategy_name}: {', '.join(unknown)} "
+                     f"(valid: {', '.join(known)})")
+
+
+def parse_methods(text):
+    """"shuffle,block" -> ["shuffle", "block"], each a Monte Carlo method"""
+    from backtest.montecarlo import BATCH_SIZE
+    
+    methods = [m.strip() for m in text.split(",") if m.strip()]
+    unknown = [m for m in methods if m not in BATCH_SIZE]
+    if unknown or not methods:
+        raise argparse.ArgumentTypeError(f"unknown method(s) {', '.join(unknown) or repr(text)} "
+                                         f"(choose from {', '.join(BATCH_SIZE)})")
+    return methods
+
+
+def data_range(args):
+    """--coins/--start/--end/--timeframe as load_data kwargs"""
+    return {
+        "coins": args.coins.split(",") if args.coins else None,
+        "start": args.start,
+        "end": args.end,
+        "timeframe": args.timeframe,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Crypto backtesting", epilog="python run.py <command> --help")
+    sub = parser.add_subparsers(dest="command", metavar="command")
+    
+    data = argparse.ArgumentParser(add_help=False)
+    group = data.add_argument_group("data range")
+    group.add_argument("--coins", help="comma-separated coin ids (default: all)")
+    group.add_argument("--start", help="first bar timestamp, e.g. 2026-02-01")
+    group.add_argument("--end", help="last bar timestamp")
+    group.add_argument("--timeframe", choices=("1m", "5m", "15m", "1h", "4h", "1d"),
+                       help="resample stored bars to a coarser timeframe")
+    workers = argparse.ArgumentParser(add_help=False)
+    workers.add_argument("--workers", type=int, default=None, help="worker processes")
+    params = argparse.ArgumentParser(add_help=False)
+    params.add_argument("-p", "--param", type=parse_param, action="append", default=[], metavar="NAME=VALUE",
+                        help="strategy parameter (repeatable), e.g. -p period=10")
+    no_cache = argparse.ArgumentParser(add_help=False)
+    no_cache.add_argument("--no-cache", action="store_true", help="recompute instead of reusing cached results")
+    
+    fetch = sub.add_parser("fetch", help="fetch bars for cheap coins into the data store")
+    fetch.add_argument("--bar-size", default="1h", choices=("1m", "5m", "15m", "1h", "4h", "1d"))
+    fetch.add_argument("--refresh", action="store_true", help="refetch the market snapshot even if fresh")
+    
+    universe = sub.add_parser("universe", help="screen the cached market snapshot")
+    universe.add_argument("--max-price", type=float)
+    universe.add_argument("--min-price", type=float)
+    universe.add_argument("--min-volume", type=float)
+    universe.add_argument("--min-cap", type=float)
+    universe.add_argument("--max-cap", type=float)
+    universe.add_argument("--limit", type=int, default=50)
+    universe.add_argument("--refresh", action="store_true", help="refetch the market snapshot even if fresh")
+    
+    ingest = sub.add_parser("ingest", help="import a CSV of OHLCV rows into the data store")
+    ingest.add_argument("csv")
+    
+    backtest = sub.add_parser("backtest", parents=[data, workers, params, no_cache], help="backtest one strategy")
+    backtest.add_argument("strategy", nargs="?", default="rsi_v3")
+    backtest.add_argument("--vectorized", action="store_true", help="signal-array engine instead of per-bar")
+    backtest.add_argument("--portfolio", action="store_true", help="shared balance across coins (5 positions)")
+    backtest.add_argument("--max-positions", type=int, help="shared balance with at most N open positions")
+    backtest.add_argument("--profile", action="store_true", help="print per-phase timings")
+    backtest.add_argument("--cprofile", metavar="FILE", help="write cProfile stats to FILE")
+    execution = backtest.add_argument_group("execution")
+    execution.add_argument("--fee-pct", type=float, default=0.0, help="fee in percent of each fill")
+    execution.add_argument("--fee-fixed", type=float, default=0.0, help="fixed fee per fill")
+    execution.add_argument("--slippage", type=float, default=0.0, help="slippage in percent of price")
+    execution.add_argument("--impact", type=float, default=0.0, help="slippage percent per unit of volume share")
+    execution.add_argument("--intrabar", action="store_true", help="check stops against bar high/low")
+    
+    sweep = sub.add_parser("sweep", parents=[data, workers, no_cache], help="grid search over strategy params")
+    sweep.add_argument("strategy")
+    sweep.add_argument("ranges", nargs="*", type=parse_range_arg, metavar="NAME=RANGE",
+                       help="start:stop:step (inclusive) or a,b,c")
+    sweep.add_argument("--rank", default="return_pct", choices=RANK_METRICS, metavar="METRIC",
+                       help=f"metric to rank by: {', '.join(RANK_METRICS)}")
+    
+    walkforward = sub.add_parser("walkforward", parents=[data, workers, no_cache],
+                                 help="tune on rolling train windows, score out of sample")
+    walkforward.add_argument("strategy", nargs="?", default="all", help="strategy name or all")
+    walkforward.add_argument("ranges", nargs="*", type=parse_range_arg, metavar="NAME=RANGE")
+    walkforward.add_argument("--train", type=int, default=90, help="train bars per fold")
+    walkforward.add_argument("--test", type=int, default=30, help="test bars per fold")
+    walkforward.add_argument("--step", type=int, help="bars between folds (default: --test)")
+    walkforward.add_argument("--rank", default="return_pct", choices=RANK_METRICS, metavar="METRIC",
+                             help=f"metric to pick each fold's params by: {', '.join(RANK_METRICS)}")
+    
+    montecarlo = sub.add_parser("montecarlo", parents=[data, workers, params], help="robustness simulations")
+    montecarlo.add_argument("strategy", nargs="?", default="rsi_v3")
+    montecarlo.add_argument("--sims", type=int, default=1000)
+    montecarlo.add_argument("--methods", type=parse_methods,
+                            help="comma-separated: shuffle,bootstrap,block (default: all)")
+    montecarlo.add_argument("--block-size", type=int, default=10)
+    montecarlo.add_argument("--seed", type=int, default=0)
+    
+    replay = sub.add_parser("replay", parents=[data, params], help="stream bars through the engine one by one")
+    replay.add_argument("strategy", nargs="?", default="rsi_v3")
+    replay.add_argument("csv", nargs="?", help="CSV file to stream as read (default: what backtest would load)")
+    
+    results = sub.add_parser("results", help="show the latest result")
+    results.add_argument("strategy", nargs="?", help="latest result of this strategy (results name)")
+    results.add_argument("--trades", type=int, default=10, help="number of trades to list")
+    
+    compare = sub.add_parser("compare", aliases=["list"], help="compare saved results")
+    compare.add_argument("strategy", nargs="?", help="only runs of this strategy (results name)")
+    compare.add_argument("--limit", type=int, help="newest N runs")
+    
+    cache = sub.add_parser("cache", help="show or clear the result cache")
+    cache.add_argument("action", nargs="?", choices=("clear",))
+    cache.add_argument("kind", nargs="?", choices=("results", "sweeps", "indicators"))
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.command == "fetch":
+        fetch_data(bar_size=args.bar_size, refresh=args.refresh)
+    elif args.command == "universe":
+        screen_universe(refresh=args.refresh, limit=args.limit, max_price=args.max_price, min_price=args.min_price,
+                        min_volume=args.min_volume, min_market_cap=args.min_cap, max_market_cap=args.max_cap)
+    elif args.command == "ingest":
+        ingest_csv(args.csv)
+    elif args.command == "backtest":
+        from backtest.execution import ExecutionModel
+        check_params(parser, args.strategy, dict(args.param), cross_sectional=True)
+        execution = ExecutionModel(fee_pct=args.fee_pct, fee_fixed=args.fee_fixed, slippage_pct=args.slippage,
+                                   impact=args.impact, intrabar=args.intrabar)
+        max_positions = args.max_positions or (5 if args.portfolio else None)
+        run_backtest(args.strategy, vectorized=args.vectorized, workers=args.workers, data_range=data_range(args),
+                     max_positions=max_positions, profile=args.profile, cprofile_path=args.cprofile,
+                     execution=execution, use_cache=not args.no_cache, **dict(args.param))
+    elif args.command == "sweep":
+        check_params(parser, args.strategy, dict(args.ranges))
+        run_sweep(args.strategy, dict(args.ranges), workers=args.workers, rank_by=args.rank,
+                  data_range=data_range(args), use_cache=not args.no_cache)
+    elif args.command == "walkforward":
+        from strategies.base import STRATEGIES
+        if args.strategy == "all":
+            if args.ranges:
+                parser.error("walkforward all tunes each strategy's built-in grid; name one strategy to give ranges")
+        else:
+            check_params(parser, args.strategy, dict(args.ranges))
+        names = list(STRATEGIES) if args.strategy == "all" else [args.strategy]
+        run_walkforward(names, dict(args.ranges) or None, args.train, args.test, args.step, args.workers,
+                        args.rank, data_range(args), use_cache=not args.no_cache)
+    elif args.command == "montecarlo":
+        check_params(parser, args.strategy, dict(args.param))
+        run_montecarlo(args.strategy, args.sims, args.methods, args.block_size,
+                       args.seed, args.workers, data_range(args), **dict(args.param))
+    elif args.command == "replay":
+        check_params(parser, args.strategy, dict(args.param))
+        if args.csv and any(data_range(args).values()):
+            parser.error("--coins/--start/--end/--timeframe select what backtest would load; drop the CSV argument")
+        run_replay(args.strategy, args.csv, data_range(args), **dict(args.param))
+    elif args.command == "results":
+        show_results(args.strategy, args.trades)
+    elif args.command in ("compare", "list"):
+        compare_results(args.strategy, args.limit)
+    elif args.command == "cache":
+        cache_command(args.action, args.kind)
     else:
-        print(__doc__)
+        parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
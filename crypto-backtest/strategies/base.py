@@ -3,33 +3,238 @@
 Enhanced Strategy Framework v3 - With filters, stop-loss, position sizing
 """
 
+import numpy as np
 import pandas as pd
+from typing import Dict
+
+from data.bars import BarCache, align_to
+from strategies.rules import RuleProgram
+
+
+# Indicators - each takes a float Series for one coin and returns a Series of the same length
+
+def rsi(values, period):
+    delta = values.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+def sma(values, period):
+    return values.rolling(window=period).mean()
+
+def volume_ma(values, period):
+    """Mean of the `period` bars before each bar (current bar excluded)"""
+    return values.shift(1).rolling(window=period, min_periods=1).mean()
+
+def momentum(values, lookback):
+    """Ratio of each value to the value `lookback` bars earlier"""
+    return values / values.shift(lookback)
+
+def lag(values, periods):
+    """Value `periods` bars earlier"""
+    return values.shift(periods)
+
+INDICATORS = {
+    "rsi": rsi,
+    "sma": sma,
+    "volume_ma": volume_ma,
+    "momentum": momentum,
+    "lag": lag,
+}
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def _higher_timeframe(kind, column, window, timeframe, frame, bars, coin):
+    """Indicator computed on coin's bars resampled to timeframe (via bars), aligned back to frame's bars"""
+    higher = bars.get(coin, timeframe)
+    values = INDICATORS[kind](pd.Series(higher[column].to_numpy(dtype=float)), window).to_numpy()
+    return align_to(frame["timestamp"], bars.base_timeframe(coin), higher["timestamp"], timeframe, values)
+
+
+def compute_indicators(df, specs, cache=None, bars=None) -> Dict[str, np.ndarray]:
+    """Compute indicator specs {name: (kind, column, window[, timeframe])} as whole columns.
+
+    Windows never cross coin boundaries: each coin is computed separately and
+    written back at its positions, so arrays line up with df by position.
+    Specs whose source column is missing are skipped. The result also holds
+    the raw price columns and "bar", the position of each row within its coin.
+    
+    A spec with a timeframe (e.g. "4h" on 1h bars) is computed on bars
+    resampled to that timeframe and mapped back onto each bar from the last
+    higher-timeframe bar closed by then, so there is no lookahead.
+    
+    cache, if given, must be a dict dedicated to this df; arrays are stored
+    in it by their spec so strategies that share an indicator
+    (e.g. one RSI period across many thresholds) compute it once.
+    
+    bars, if given, is a data.bars.BarCache over df that timeframe specs
+    resample through, so each coin is resampled to a timeframe once for
+    as long as the BarCache is kept. Without one, resampled bars are only
+    shared within this call.
+    """
+    if "coin" in df.columns and df["coin"].nunique() > 1:
+        groups = list(df.groupby("coin", sort=False).indices.values())
+    else:
+        groups = None
+    
+    columns = {col: df[col].to_numpy(dtype=float) for col in PRICE_COLUMNS if col in df.columns}
+    # Bar position within its own coin, used for warmup checks
+    if groups is None:
+        columns["bar"] = np.arange(len(df))
+    else:
+        columns["bar"] = np.empty(len(df), dtype=np.int64)
+        for positions in groups:
+            columns["bar"][positions] = np.arange(len(positions))
+    for name, spec in specs.items():
+        kind, column, window = spec[:3]
+        timeframe = spec[3] if len(spec) > 3 else None
+        if column not in columns:
+            continue
+        key = tuple(spec)
+        if cache is not None and key in cache:
+            columns[name] = cache[key]
+            continue
+        source = columns[column]
+        if timeframe is not None:
+            if bars is None:
+                bars = BarCache(df if "coin" in df.columns else df.assign(coin=""))
+            values = np.full(len(source), np.nan)
+            for positions in (groups if groups is not None else [np.arange(len(df))]):
+                coin = df["coin"].iloc[positions[0]] if "coin" in df.columns else ""
+                values[positions] = _higher_timeframe(kind, column, window, timeframe, df.iloc[positions], bars,
+                                                      coin)
+        elif groups is None:
+            values = INDICATORS[kind](pd.Series(source), window).to_numpy()
+        else:
+            values = np.full(len(source), np.nan)
+            for positions in groups:
+                values[positions] = INDICATORS[kind](pd.Series(source[positions]), window).to_numpy()
+        columns[name] = values
+        if cache is not None:
+            cache[key] = values
+    return columns
+
 
 class Strategy:
+    """Base strategy.
+
+    Subclasses declare indicators() and express entry_rule/exit_rule over
+    whole arrays, plus the trade-dependent exits in risk(). The per-bar
+    entry_condition/exit_condition used by the row engine and the signal
+    arrays used by the vectorized engine are both derived from these, so
+    the two engine paths always agree.
+    """
+    
     def __init__(self, name, params=None):
         self.name = name
         self.params = params or {}
+        self._frame = None
+        self._columns = {}
+        self._signals = None
+        self._positions = None
+    
+    def __getstate__(self):
+        # Per-frame caches are rebuilt on demand; don't ship them to worker processes
+        state = self.__dict__.copy()
+        state.update(_frame=None, _columns={}, _signals=None, _positions=None)
+        return state
+    
+    def indicators(self) -> Dict[str, tuple]:
+        """Declare indicators as {name: (kind, column, window[, timeframe])}, see INDICATORS"""
+        if self.params.get("min_volume"):
+            return {"filter_volume_ma": ("volume_ma", "volume", 10)}
+        return {}
+    
+    def prepare(self, df, cache=None, bars=None) -> Dict[str, np.ndarray]:
+        """Precompute price columns and declared indicators for df (see compute_indicators for cache and bars)"""
+        self._frame = df
+        self._columns = compute_indicators(df, self.indicators(), cache, bars)
+        self._signals = None
+        self._positions = None
+        return self._columns
+    
+    def columns(self, df) -> Dict[str, np.ndarray]:
+        """Precomputed arrays for df, indexed by the same idx as the conditions"""
+        if self._frame is not df:
+            return self.prepare(df)
+        return self._columns
+    
+    def bar_position(self, df, timestamp) -> int:
+        """Position of timestamp in df, from a map built once per frame"""
+        self.columns(df)
+        if self._positions is None:
+            self._positions = {ts: i for i, ts in enumerate(pd.to_datetime(df["timestamp"]))}
+        return self._positions[pd.Timestamp(timestamp)]
+    
+    def entry_index(self, df, trade) -> int:
+        """Bar the trade was entered on; falls back to a timestamp lookup"""
+        if isinstance(trade, dict):
+            if trade.get("entry_idx") is not None:
+                return trade["entry_idx"]
+            return self.bar_position(df, trade["entry_time"])
+        if getattr(trade, "entry_idx", None) is not None:
+            return trade.entry_idx
+        return self.bar_position(df, trade.entry_time)
+    
+    def risk(self) -> Dict:
+        """Trade-dependent exits: stop_loss/take_profit in pnl percent, max_bars held (None disables)"""
+        return {"stop_loss": None, "take_profit": None, "max_bars": None}
+    
+    def entry_rule(self, cols) -> np.ndarray:
+        """Boolean entry array over the precomputed columns"""
+        raise NotImplementedError
+    
+    def exit_rule(self, cols) -> np.ndarray:
+        """Boolean exit array over the precomputed columns, independent of the open trade"""
+        return np.zeros(len(cols["close"]), dtype=bool)
+    
+    def filter_mask(self, cols) -> np.ndarray:
+        mask = np.ones(len(cols["close"]), dtype=bool)
+        if "volume" not in cols:
+            return mask
+        # Volume filter - require minimum volume
+        if self.params.get("min_volume"):
+            vol_ma = cols["filter_volume_ma"]
+            below = (vol_ma > 0) & (cols["volume"] < vol_ma * 0.5)  # Below 50% of recent avg
+            mask &= ~((cols["bar"] >= 5) & below)
+        return mask
+    
+    def signals(self, df) -> Dict:
+        """Entry/exit arrays for df plus the risk() settings, cached per frame"""
+        cols = self.columns(df)
+        if self._signals is None:
+            filters = self.filter_mask(cols)
+            self._signals = {
+                "entry": filters & self.entry_rule(cols),
+                "exit": self.exit_rule(cols),
+                "filters": filters,
+                **self.risk(),
+            }
+        return self._signals
         
     def entry_condition(self, df, idx) -> bool:
-        raise NotImplementedError
+        return bool(self.signals(df)["entry"][idx])
         
-    def exit_condition(self, df, idx, trade) -> bool:
-        raise NotImplementedError
+    def exit_condition(self, df, idx, trade):
+        """Exit reason ("stop_loss", "take_profit", "max_bars", "signal") or False to hold"""
+        signals = self.signals(df)
+        pnl = self.get_pnl_pct(df, idx, trade)
+        if signals["stop_loss"] is not None and pnl < -signals["stop_loss"]:
+            return "stop_loss"
+        if signals["take_profit"] is not None and pnl > signals["take_profit"]:
+            return "take_profit"
+        if signals["max_bars"] is not None and idx - self.entry_index(df, trade) >= signals["max_bars"]:
+            return "max_bars"
+        return "signal" if signals["exit"][idx] else False
     
     def filters(self, df, idx) -> bool:
-        if "volume" not in df.columns:
-            return True
-        # Volume filter - require minimum volume
-        if self.params.get("min_volume") and idx >= 5:
-            vol = df["volume"].iloc[idx] if idx < len(df) else 0
-            vol_ma = df["volume"].iloc[max(0,idx-10):idx].mean()
-            if vol_ma > 0 and vol < vol_ma * 0.5:  # Below 50% of recent avg
-                return False
-        return True
+        return bool(self.signals(df)["filters"][idx])
     
     def get_pnl_pct(self, df, idx, trade):
         entry = trade["entry_price"] if isinstance(trade, dict) else trade.entry_price
-        current = df["close"].iloc[idx]
+        current = self.columns(df)["close"][idx]
         return ((current - entry) / entry) * 100 if entry > 0 else 0
     
     def get_position_size(self):
@@ -37,9 +242,79 @@ class Strategy:
         return self.params.get("position_size", 1.0)  # Default full position
 
 
-class ImprovedRSIV3(Strategy):
+class RuleStrategy(Strategy):
+    """Strategy whose rules are expressions (see strategies.rules) rather than code.
+
+    entry/exit are rule texts and risk maps risk() keys to expressions over
+    the params. Subclasses can set them as class attributes. Indicators
+    are derived from the rules, and all rules share one compiled program,
+    so a subexpression used by both entry and exit is computed once.
+    """
+    
+    entry = None
+    exit = None
+    risk_rules: Dict[str, str] = {}
+    
+    def __init__(self, name, params=None, entry=None, exit=None, risk=None):
+        super().__init__(name, params)
+        rules = {"entry": entry or self.entry, **(risk if risk is not None else self.risk_rules)}
+        if exit or self.exit:
+            rules["exit"] = exit or self.exit
+        self.program = RuleProgram(rules, self.params, INDICATORS)
+        self._memo_cols = None
+        self._memo = {}
+    
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.update(_memo_cols=None, _memo={})
+        return state
+    
+    def indicators(self):
+        return {**super().indicators(), **self.program.indicators}
+    
+    def risk(self):
+        risk = super().risk()
+        risk.update({key: self.program.constant(key) for key in risk if key in self.program.outputs})
+        return risk
+    
+    def _rule(self, name, cols) -> np.ndarray:
+        if cols is not self._memo_cols:
+            self._memo_cols, self._memo = cols, {}
+        values = self.program.evaluate(name, cols, self._memo)
+        return np.broadcast_to(np.asarray(values, dtype=bool), (len(cols["close"]),))
+    
+    def entry_rule(self, cols):
+        return self._rule("entry", cols)
+    
+    def exit_rule(self, cols):
+        if "exit" not in self.program.outputs:
+            return super().exit_rule(cols)
+        return self._rule("exit", cols)
+
+
+class RuleSet:
+    """Registry entry for a rule strategy: call with param overrides to build a RuleStrategy"""
+    
+    def __init__(self, name, entry, exit=None, risk=None, **defaults):
+        self.name = name
+        self.entry = entry
+        self.exit = exit
+        self.risk = risk or {}
+        self.defaults = defaults
+    
+    def __call__(self, **params) -> RuleStrategy:
+        return RuleStrategy(self.name, {**self.defaults, **params}, self.entry, self.exit, self.risk)
+
+
+class ImprovedRSIV3(RuleStrategy):
     """RSI with tuned thresholds and position sizing"""
     
+    entry = "bar >= period + 5 & rsi(close, period) < oversold"
+    # RSI overbought
+    exit = "bar >= period & rsi(close, period) > overbought"
+    # Tight stop-loss, take profit at 2:1 ratio
+    risk_rules = {"stop_loss": "stop_loss * 100", "take_profit": "stop_loss * 200"}
+    
     def __init__(self, period=14, oversold=40, overbought=60, stop_loss=0.03, position_size=0.2):
         super().__init__("RSIv3", {
             "period": period, 
@@ -48,79 +323,40 @@ class ImprovedRSIV3(Strategy):
             "stop_loss": stop_loss,
             "position_size": position_size
         })
-        
+    
     def calculate_rsi(self, prices):
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=self.params["period"]).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=self.params["period"]).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
-    
-    def entry_condition(self, df, idx):
-        if idx < self.params["period"] + 5:
-            return False
-        if not self.filters(df, idx):
-            return False
-        rsi = self.calculate_rsi(df["close"])
-        return rsi.iloc[idx] < self.params["oversold"]
-        
-    def exit_condition(self, df, idx, trade):
-        pnl = self.get_pnl_pct(df, idx, trade)
-        # Tight stop-loss
-        if pnl < -self.params["stop_loss"] * 100:
-            return True
-        # Take profit at 2:1 ratio
-        if pnl > self.params["stop_loss"] * 200:
-            return True
-        # RSI overbought
-        if idx < self.params["period"]:
-            return False
-        rsi = self.calculate_rsi(df["close"])
-        return rsi.iloc[idx] > self.params["overbought"]
-
-
-class VolumeConfirmedMomentum(Strategy):
+        return rsi(prices, self.params["period"])
+
+
+class VolumeConfirmedMomentum(RuleStrategy):
     """Momentum with volume confirmation and small positions"""
     
+    # 1.5% gain over the lookback window, on rising volume when the data has it
+    entry = (
+        "bar >= lookback + 5 & lookback >= 2"
+        " & lag(close, 1) > lag(close, lookback) * 1.015"
+        " & optional(~(volume_ma(volume, 5) > 0) | (volume > volume_ma(volume, 5) * 1.2), True)"
+    )
+    # Price reversal
+    exit = "bar > 2 & lag(close, 1) < lag(close, 2) * 0.98"
+    risk_rules = {"stop_loss": "stop_loss * 100", "take_profit": "stop_loss * 200"}
+    
     def __init__(self, lookback=3, stop_loss=0.02, position_size=0.15):
         super().__init__("VolMomentumV3", {
             "lookback": lookback,
             "stop_loss": stop_loss,
             "position_size": position_size
         })
-        
-    def entry_condition(self, df, idx):
-        if idx < self.params["lookback"] + 5:
-            return False
-        if not self.filters(df, idx):
-            return False
-        # Price momentum
-        window = df.iloc[idx-self.params["lookback"]:idx]
-        if len(window) < 2:
-            return False
-        price_up = window["close"].iloc[-1] > window["close"].iloc[0] * 1.015  # 1.5% gain
-        # Volume confirmation
-        vol_ma = df["volume"].iloc[max(0,idx-5):idx].mean() if "volume" in df.columns else 0
-        volume_up = df["volume"].iloc[idx] > vol_ma * 1.2 if vol_ma > 0 else True
-        return price_up and volume_up
-        
-    def exit_condition(self, df, idx, trade):
-        pnl = self.get_pnl_pct(df, idx, trade)
-        if pnl < -self.params["stop_loss"] * 100:
-            return True
-        if pnl > self.params["stop_loss"] * 200:
-            return True
-        # Price reversal
-        if idx > 2:
-            window = df.iloc[idx-2:idx]
-            if window["close"].iloc[-1] < window["close"].iloc[0] * 0.98:
-                return True
-        return False
-
-
-class TightBandStrategy(Strategy):
+
+
+class TightBandStrategy(RuleStrategy):
     """Mean reversion with tight bands and small positions"""
     
+    # Tight band - 1% below MA, out at the band edge
+    entry = "bar >= ma_period & close < sma(close, ma_period) * (1 - band)"
+    exit = "bar >= ma_period & close > sma(close, ma_period) * (1 + band * 0.5)"
+    risk_rules = {"stop_loss": "stop_loss * 100"}
+    
     def __init__(self, ma_period=10, band=0.01, stop_loss=0.02, position_size=0.15):
         super().__init__("TightBand", {
             "ma_period": ma_period,
@@ -128,67 +364,22 @@ class TightBandStrategy(Strategy):
             "stop_loss": stop_loss,
             "position_size": position_size
         })
-        
-    def entry_condition(self, df, idx):
-        if idx < self.params["ma_period"]:
-            return False
-        if not self.filters(df, idx):
-            return False
-        ma = df["close"].rolling(window=self.params["ma_period"]).mean()
-        current = df["close"].iloc[idx]
-        ma_val = ma.iloc[idx]
-        # Tight band - 1% below MA
-        return current < ma_val * (1 - self.params["band"])
-        
-    def exit_condition(self, df, idx, trade):
-        pnl = self.get_pnl_pct(df, idx, trade)
-        if pnl < -self.params["stop_loss"] * 100:
-            return True
-        # At band edge
-        if idx >= self.params["ma_period"]:
-            ma = df["close"].rolling(window=self.params["ma_period"]).mean()
-            current = df["close"].iloc[idx]
-            ma_val = ma.iloc[idx]
-            if current > ma_val * (1 + self.params["band"] * 0.5):
-                return True
-        return False
-
-
-class ScalperStrategy(Strategy):
+
+
+class ScalperStrategy(RuleStrategy):
     """Quick scalps - very short term, tight stops"""
     
+    # 3 consecutive up candles
+    entry = "bar >= 3 & lag(close, 2) > lag(close, 3) & lag(close, 1) > lag(close, 2)"
+    # Quick profit, tight stop, 4 bars max
+    risk_rules = {"stop_loss": "stop_loss * 100", "take_profit": "gain_threshold * 100", "max_bars": "4"}
+    
     def __init__(self, gain_threshold=0.015, stop_loss=0.01, position_size=0.1):
         super().__init__("Scalper", {
             "gain_threshold": gain_threshold,
             "stop_loss": stop_loss,
             "position_size": position_size
         })
-        
-    def entry_condition(self, df, idx):
-        if idx < 3:
-            return False
-        if not self.filters(df, idx):
-            return False
-        # 3 consecutive up candles
-        window = df.iloc[idx-3:idx]
-        if len(window) < 3:
-            return False
-        up = all(window["close"].iloc[i] > window["close"].iloc[i-1] for i in range(1, len(window)))
-        return up
-        
-    def exit_condition(self, df, idx, trade):
-        pnl = self.get_pnl_pct(df, idx, trade)
-        # Quick profit
-        if pnl > self.params["gain_threshold"] * 100:
-            return True
-        # Tight stop
-        if pnl < -self.params["stop_loss"] * 100:
-            return True
-        # Max 1 hour
-        entry_idx = df[df["timestamp"] == trade["entry_time"]].index[0] if isinstance(trade, dict) else df[df["timestamp"] == trade.entry_time].index[0]
-        if idx - entry_idx >= 4:  # 4 hours max
-            return True
-        return False
 
 
 # Registry
@@ -197,6 +388,14 @@ STRATEGIES = {
     "vol_momentum_v3": VolumeConfirmedMomentum,
     "tight_band": TightBandStrategy,
     "scalper": ScalperStrategy,
+    # Declared entirely as rules
+    "rsi_volume": RuleSet(
+        "RSIVolume",
+        entry="bar >= period + 5 & rsi(period) < oversold & optional(volume > sma(volume, 5) * 1.2, True)",
+        exit="bar >= period & rsi(period) > overbought",
+        risk={"stop_loss": "stop_loss * 100", "take_profit": "stop_loss * 200"},
+        period=14, oversold=40, overbought=60, stop_loss=0.03, position_size=0.2,
+    ),
 }
 
 def get_strategy(name, **kwargs) -> Strategy:
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Cross-Sectional Strategies - Rank the whole universe on each bar
+
+These strategies work on a data.panel.Panel rather than one coin's frame.
+scores() returns a (timestamp x coin) array computed with whole-panel
+NumPy operations, and every coin on a bar is ranked in one row-wise
+argpartition. The engine holds the selected coins
+(BacktestEngine.run_cross_section), so one pass covers hundreds of coins.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+from data.panel import Panel
+
+
+def lag_bars(values, valid, periods) -> np.ndarray:
+    """Each valid cell's value from periods of that coin's own bars earlier (NaN where there is none)
+
+    Rows of the union timeline are not bars of every coin, so the lag
+    counts each coin's valid cells rather than rows.
+    """
+    valid_t = valid.T
+    bars = (np.cumsum(valid_t, axis=1) - 1)[valid_t]
+    values_t = np.asarray(values, dtype=float).T[valid_t]  # coin by coin, in time order
+    lagged = np.full(valid_t.shape, np.nan)
+    back = np.flatnonzero(bars >= periods)
+    lagged.flat[np.flatnonzero(valid_t)[back]] = values_t[back - periods]
+    return lagged.T
+
+
+def top_n(scores, n) -> np.ndarray:
+    """Boolean mask of the n highest finite scores per row (fewer if a row has fewer)"""
+    scores = np.where(np.isfinite(scores), scores, -np.inf)
+    n = min(n, scores.shape[1])
+    picked = np.zeros(scores.shape, dtype=bool)
+    if n <= 0:
+        return picked
+    best = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    np.put_along_axis(picked, best, True, axis=1)
+    return picked & np.isfinite(scores)
+
+
+class CrossSectionalStrategy:
+    """Base cross-sectional strategy.
+
+    Subclasses implement scores(panel): higher is better, NaN marks a coin
+    that can't be held on that bar. Every `rebalance` bars from warmup()
+    on, the top_n coins with a valid bar and a score above min_score become
+    the target holdings until the next rebalance.
+    """
+
+    def __init__(self, name, params=None):
+        self.name = name
+        self.params = params or {}
+
+    def scores(self, panel: Panel) -> np.ndarray:
+        raise NotImplementedError
+
+    def warmup(self) -> int:
+        """Bars before scores are meaningful"""
+        return 0
+
+    def targets(self, panel: Panel) -> np.ndarray:
+        """(timestamp x coin) mask of the coins to hold after each bar"""
+        rows = np.arange(len(panel))
+        start, every = self.warmup(), max(1, self.params.get("rebalance", 1))
+        rebalance = rows[start::every]
+        scores = np.where(panel.valid, self.scores(panel), np.nan)[rebalance]
+        if self.params.get("min_score") is not None:
+            scores[scores <= self.params["min_score"]] = np.nan
+        picked = top_n(scores, self.params.get("top_n", 1))
+
+        targets = np.zeros(panel.shape, dtype=bool)
+        if len(rebalance):
+            held = rows >= start
+            targets[held] = picked[(rows[held] - start) // every]
+        return targets
+
+    def get_position_size(self):
+        """Fraction of equity staked per holding, by default an equal share of top_n"""
+        return self.params.get("position_size") or 1 / self.params.get("top_n", 1)
+
+
+class MomentumRotation(CrossSectionalStrategy):
+    """Hold the top_n coins by return over the last `lookback` bars, re-ranked every `rebalance` bars"""
+
+    def __init__(self, lookback=12, top_n=2, rebalance=6, min_score=0.0, position_size=None):
+        super().__init__("MomentumRotation", {
+            "lookback": lookback,
+            "top_n": top_n,
+            "rebalance": rebalance,
+            "min_score": min_score,
+            "position_size": position_size,
+        })
+
+    def warmup(self):
+        return self.params["lookback"]
+
+    def scores(self, panel):
+        close = panel["close"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return close / lag_bars(close, panel.valid, self.params["lookback"]) - 1
+
+
+CROSS_SECTIONAL: Dict[str, type] = {
+    "momentum_rotation": MomentumRotation,
+}
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Rule Expressions - Declarative strategy rules compiled to whole-array NumPy
+
+A rule is one expression over a coin's columns, for example
+
+    bar >= period + 5 & rsi(close, period) < oversold & volume > sma(volume, 5) * 1.2
+
+Names are price columns (open, high, low, close, volume), bar (position
+within the coin) or strategy params, which are folded in as constants.
+Indicators from strategies.base.INDICATORS are called as kind(column,
+window[, timeframe]); the column defaults to close, so rsi(14) is
+rsi(close, 14). &, | and ~ mean and/or/not and bind looser than
+comparisons, so the example needs no parentheses. Also available:
+where(cond, a, b), abs(x) and optional(expr, default), which is default
+when expr needs a column the data doesn't have (e.g. volume).
+
+Rules are parsed once with ast into a DAG in which identical
+subexpressions are a single node, shared across all of a strategy's
+rules. Evaluating a rule computes each node it needs once per set of
+columns, with one NumPy operation per node.
+"""
+
+import ast
+import io
+import operator
+import tokenize
+from typing import Dict
+
+import numpy as np
+
+COLUMNS = ("open", "high", "low", "close", "volume", "bar")
+MISSING = object()  # value of a node whose column isn't in the data
+
+BINARY = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+}
+COMPARE = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+FUNCTIONS = {
+    "and": np.logical_and,
+    "or": np.logical_or,
+    "not": np.logical_not,
+    "neg": operator.neg,
+    "abs": np.abs,
+    "where": np.where,
+}
+
+
+def _python_syntax(text):
+    """Rewrite &, | and ~ as and/or/not so they bind looser than comparisons"""
+    words = {"&": "and", "|": "or", "~": "not"}
+    tokens = []
+    for token in tokenize.generate_tokens(io.StringIO(text.strip()).readline):
+        if token.type == tokenize.OP and token.string in words:
+            tokens.append((tokenize.NAME, words[token.string]))
+        else:
+            tokens.append((token.type, token.string))
+    return tokenize.untokenize(tokens)
+
+
+class RuleProgram:
+    """Named rule expressions compiled into one shared DAG of NumPy operations"""
+
+    def __init__(self, rules: Dict[str, str], params=None, indicators=()):
+        self.params = dict(params or {})
+        self.indicator_kinds = set(indicators)
+        self.nodes = []  # (op, args) in dependency order; args are node ids or constants
+        self._ids = {}
+        self.indicators: Dict[str, tuple] = {}
+        self.outputs = {}
+        for name, text in rules.items():
+            try:
+                tree = ast.parse(_python_syntax(str(text)), mode="eval").body
+                self.outputs[name] = self._compile(tree)
+            except (SyntaxError, tokenize.TokenError) as e:
+                raise ValueError(f"Rule {name!r} is not a valid expression: {text!r} ({e})") from None
+            except ValueError as e:
+                raise ValueError(f"Rule {name!r}: {e}") from None
+
+    def __repr__(self):
+        return f"RuleProgram({len(self.nodes)} nodes, rules={list(self.outputs)})"
+
+    def _node(self, op, *args):
+        """Id of the node for op(args), reusing an identical existing node"""
+        key = (op, args)
+        if key not in self._ids:
+            self._ids[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self._ids[key]
+
+    def _const(self, value):
+        # Keyed by type too: 1, 1.0 and True are equal as dict keys but not as results
+        return self._node("const", value, type(value).__name__)
+
+    def _value(self, node):
+        """Constant value of a node id, or raise if it depends on the data"""
+        op, args = self.nodes[node]
+        if op != "const":
+            raise ValueError("expected a constant (a number or a param)")
+        return args[0]
+
+    def _fold(self, fn, op, *children):
+        """Node for fn(children): folded to a constant when every child is one"""
+        if all(self.nodes[c][0] == "const" for c in children):
+            return self._const(fn(*(self._value(c) for c in children)))
+        return self._node(op, *children)
+
+    def _compile(self, tree) -> int:
+        if isinstance(tree, ast.Constant):
+            if isinstance(tree.value, (bool, int, float, str)):
+                return self._const(tree.value)
+            raise ValueError(f"unsupported constant {tree.value!r}")
+        if isinstance(tree, ast.Name):
+            if tree.id in self.params:
+                return self._const(self.params[tree.id])
+            if tree.id in COLUMNS:
+                return self._node("column", tree.id)
+            raise ValueError(f"unknown name {tree.id!r} (not a column or param)")
+        if isinstance(tree, ast.BinOp) and type(tree.op) in BINARY:
+            fn = BINARY[type(tree.op)]
+            return self._fold(fn, fn.__name__, self._compile(tree.left), self._compile(tree.right))
+        if isinstance(tree, ast.UnaryOp):
+            if isinstance(tree.op, ast.Not):
+                return self._fold(operator.not_, "not", self._compile(tree.operand))
+            if isinstance(tree.op, ast.USub):
+                return self._fold(operator.neg, "neg", self._compile(tree.operand))
+            if isinstance(tree.op, ast.UAdd):
+                return self._compile(tree.operand)
+        if isinstance(tree, ast.BoolOp):
+            op = "and" if isinstance(tree.op, ast.And) else "or"
+            fn = (lambda a, b: a and b) if op == "and" else (lambda a, b: a or b)
+            node = self._compile(tree.values[0])
+            for value in tree.values[1:]:
+                node = self._fold(fn, op, node, self._compile(value))
+            return node
+        if isinstance(tree, ast.Compare):
+            # a < b < c means (a < b) & (b < c)
+            node, left = None, self._compile(tree.left)
+            for op, right in zip(tree.ops, tree.comparators):
+                if type(op) not in COMPARE:
+                    raise ValueError(f"unsupported comparison {type(op).__name__}")
+                fn = COMPARE[type(op)]
+                right = self._compile(right)
+                term = self._fold(fn, fn.__name__, left, right)
+                node = term if node is None else self._fold(lambda a, b: a and b, "and", node, term)
+                left = right
+            return node
+        if isinstance(tree, ast.Call) and isinstance(tree.func, ast.Name) and not tree.keywords:
+            return self._call(tree.func.id, tree.args)
+        raise ValueError(f"unsupported syntax: {ast.unparse(tree)}")
+
+    def _call(self, name, args) -> int:
+        if name in self.indicator_kinds:
+            column = "close"
+            if args and isinstance(args[0], ast.Name) and args[0].id in COLUMNS:
+                column, args = args[0].id, args[1:]
+            if not 1 <= len(args) <= 2:
+                raise ValueError(f"{name}() takes an optional column, a window and an optional timeframe")
+            spec = (name, column, self._value(self._compile(args[0])))
+            if len(args) == 2:
+                spec += (self._value(self._compile(args[1])),)
+            key = "_".join(str(part) for part in spec)
+            self.indicators[key] = spec
+            return self._node("indicator", key)
+        children = [self._compile(arg) for arg in args]
+        if name == "optional" and len(children) == 2:
+            return self._node("optional", *children)
+        if name == "where" and len(children) == 3:
+            return self._node("where", *children)
+        if name == "abs" and len(children) == 1:
+            return self._fold(abs, "abs", *children)
+        raise ValueError(f"unknown function {name}() with {len(children)} arguments")
+
+    def evaluate(self, name, cols, memo=None):
+        """Value of rule `name` over cols (arrays from compute_indicators or a stream).
+
+        memo holds node values between calls on the same cols, so rules
+        evaluated one after another share their common subexpressions.
+        """
+        memo = {} if memo is None else memo
+        value = self._eval(self.outputs[name], cols, memo)
+        if value is MISSING:
+            missing = [args[0] for op, args in self.nodes if op in ("column", "indicator") and args[0] not in cols]
+            raise ValueError(f"Rule {name!r} needs columns missing from the data: {missing}")
+        return value
+
+    def constant(self, name):
+        """Value of a rule that folded to a constant (e.g. a risk setting computed from params)"""
+        return self._value(self.outputs[name])
+
+    def _eval(self, node, cols, memo):
+        if node in memo:
+            return memo[node]
+        op, args = self.nodes[node]
+        if op == "const":
+            value = args[0]
+        elif op in ("column", "indicator"):
+            value = cols.get(args[0], MISSING)
+        elif op == "optional":
+            value = self._eval(args[0], cols, memo)
+            if value is MISSING:
+                value = self._eval(args[1], cols, memo)
+        else:
+            values = [self._eval(arg, cols, memo) for arg in args]
+            if any(v is MISSING for v in values):
+                value = MISSING
+            else:
+                fn = FUNCTIONS.get(op) or getattr(operator, op)
+                value = fn(*values)
+        memo[node] = value
+        return value
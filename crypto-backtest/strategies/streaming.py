@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Streaming Indicators - O(1) per-bar versions of the batch indicators
+
+Each indicator keeps a bounded ring buffer and running state, so a coin's
+memory use is fixed by its longest window no matter how long the feed
+runs. The rolling mean follows the same compensated add/remove steps as
+pandas' rolling mean, so streamed values (and therefore signals) match
+the batch columns from strategies.base.compute_indicators.
+"""
+
+import math
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+from strategies.base import PRICE_COLUMNS
+
+
+class RollingMean:
+    """Rolling mean over the last `window` values, NaNs skipped"""
+
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque(maxlen=window)
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same_count = 0
+        self.prev_value = None
+
+    def update(self, val) -> float:
+        if self.prev_value is None:
+            self.prev_value = val
+        if len(self.values) == self.window:
+            self._remove(self.values[0])
+        self.values.append(val)
+        self._add(val)
+        return self.value()
+
+    def _add(self, val):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        # Count repeats so a flat window returns the value itself, not a float artifact
+        if val == self.prev_value:
+            self.same_count += 1
+        else:
+            self.same_count = 1
+        self.prev_value = val
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def value(self) -> float:
+        if self.nobs < self.min_periods or self.nobs == 0:
+            return math.nan
+        result = self.sum_x / self.nobs
+        if self.same_count >= self.nobs:
+            return self.prev_value
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+class Lag:
+    """Value `periods` updates ago (NaN until then)"""
+
+    def __init__(self, periods):
+        self.values = deque(maxlen=periods + 1)
+
+    def update(self, val) -> float:
+        self.values.append(val)
+        if len(self.values) < self.values.maxlen:
+            return math.nan
+        return self.values[0]
+
+
+class StreamingSMA:
+    def __init__(self, period):
+        self.mean = RollingMean(period)
+
+    def update(self, val):
+        return self.mean.update(val)
+
+
+class StreamingVolumeMA:
+    """Mean of the `period` values before the current one"""
+
+    def __init__(self, period):
+        self.mean = RollingMean(period, min_periods=1)
+        self.previous = math.nan
+
+    def update(self, val):
+        result = self.mean.update(self.previous)
+        self.previous = val
+        return result
+
+
+class StreamingMomentum:
+    def __init__(self, lookback):
+        self.lag = Lag(lookback)
+
+    def update(self, val):
+        base = self.lag.update(val)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return float(np.float64(val) / np.float64(base))
+
+
+class StreamingLag:
+    def __init__(self, periods):
+        self.lag = Lag(periods)
+
+    def update(self, val):
+        return self.lag.update(val)
+
+
+class StreamingRSI:
+    """Incremental form of strategies.base.rsi (rolling-mean RSI)"""
+
+    def __init__(self, period):
+        self.gain = RollingMean(period)
+        self.loss = RollingMean(period)
+        self.previous = None
+
+    def update(self, val):
+        delta = math.nan if self.previous is None else val - self.previous
+        self.previous = val
+        gain = self.gain.update(delta if delta > 0 else 0.0)
+        loss = self.loss.update(-(delta if delta < 0 else 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = np.float64(gain) / np.float64(loss)
+            return float(100 - (100 / (1 + rs)))
+
+
+STREAMING_INDICATORS = {
+    "rsi": StreamingRSI,
+    "sma": StreamingSMA,
+    "volume_ma": StreamingVolumeMA,
+    "momentum": StreamingMomentum,
+    "lag": StreamingLag,
+}
+
+
+class StreamState:
+    """Per-coin incremental indicator state for one strategy's declared specs"""
+
+    def __init__(self, specs):
+        self.bar = -1
+        self.indicators = {}
+        for name, spec in specs.items():
+            kind, column, window = spec[:3]
+            if len(spec) > 3:
+                raise ValueError(f"Indicator {name} uses a timeframe; not supported when streaming")
+            self.indicators[name] = (column, STREAMING_INDICATORS[kind](window))
+
+    def update(self, bar) -> Dict[str, np.ndarray]:
+        """Feed one bar (mapping with price columns); returns 1-element columns for the rules"""
+        self.bar += 1
+        columns = {col: np.array([float(bar[col])]) for col in PRICE_COLUMNS if col in bar}
+        columns["bar"] = np.array([self.bar])
+        for name, (column, indicator) in self.indicators.items():
+            if column in columns:
+                columns[name] = np.array([indicator.update(float(columns[column][0]))])
+        return columns
@@ -0,0 +1,25 @@
+"""
+CLI startup - read-only run.py commands stay under the startup budget
+
+Same measurement as `python -m benchmarks.bench startup`: each command
+runs in a fresh interpreter from an empty directory.
+"""
+
+import tempfile
+
+from benchmarks.bench import HEAVY_MODULES, STARTUP_BUDGET_S, STARTUP_COMMANDS, _loaded_modules, startup_times
+
+
+def test_read_only_commands_within_budget():
+    rows = {row["command"]: row for row in startup_times(STARTUP_COMMANDS, repeat=3)}
+    slow = {command: row["seconds"] for command, row in rows.items()
+            if command != "python -c pass" and row["seconds"] > STARTUP_BUDGET_S}
+    assert not slow, f"over the {STARTUP_BUDGET_S}s budget: {slow}"
+    heavy = {command: row["heavy_modules"] for command, row in rows.items() if row["heavy_modules"]}
+    assert not heavy, f"imported {HEAVY_MODULES} modules: {heavy}"
+
+
+def test_help_imports_no_numpy_or_pandas():
+    with tempfile.TemporaryDirectory() as workdir:
+        for command in (("--help",), ("backtest", "--help"), ("sweep", "--help")):
+            assert _loaded_modules(command, workdir, ("numpy", "pandas")) == [], command
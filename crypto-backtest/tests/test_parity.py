@@ -0,0 +1,146 @@
+"""
+Parity - every engine path and the rule strategies agree on the bundled CSV
+
+The row engine (per-bar entry/exit callbacks), the vectorized engine
+(signal arrays) and the streaming replay must produce the same trades,
+and the rule strategies must give the same signals as the hand-written
+per-bar strategies they replaced.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.engine import BacktestEngine
+from backtest.execution import ExecutionModel
+from data.replay import replay_csv, replay_frame
+from strategies.base import STRATEGIES, get_strategy
+
+CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ohlc_20260223.csv")
+EXECUTIONS = {
+    "close": {},
+    "costs": {"fee_pct": 0.1, "fee_fixed": 0.01, "slippage_pct": 0.05},
+    "intrabar": {"fee_pct": 0.1, "intrabar": True},
+}
+
+
+@pytest.fixture(scope="module")
+def data():
+    df = pd.read_csv(CSV)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def coin_frames(df):
+    return [group.reset_index(drop=True) for _, group in df.groupby("coin", sort=False)]
+
+
+def with_volume(df):
+    """df plus a deterministic volume column, to exercise the volume conditions"""
+    df = df.copy()
+    df["volume"] = np.random.default_rng(7).lognormal(10, 1, len(df))
+    return df
+
+
+def by_entry(trades):
+    return sorted(trades, key=lambda t: (t["coin"], t["entry_time"]))
+
+
+def run_rows(df, name, execution=None):
+    strategy = get_strategy(name)
+    engine = BacktestEngine(initial_balance=1000, execution=execution)
+    return engine.run(df, strategy.entry_condition, strategy.exit_condition, strategy.get_position_size(),
+                      risk=strategy.risk())
+
+
+@pytest.mark.parametrize("execution", EXECUTIONS)
+@pytest.mark.parametrize("name", STRATEGIES)
+def test_vectorized_matches_rows(data, name, execution):
+    rows = run_rows(data, name, ExecutionModel(**EXECUTIONS[execution]))
+    engine = BacktestEngine(initial_balance=1000, execution=ExecutionModel(**EXECUTIONS[execution]))
+    vectorized = engine.run_signals(data, get_strategy(name))
+    assert rows["total_trades"] > 0
+    assert vectorized["trades"] == rows["trades"]
+
+
+@pytest.mark.parametrize("name", STRATEGIES)
+def test_stream_matches_batch(data, name):
+    batch = run_rows(data, name)
+    from_file = BacktestEngine(initial_balance=1000).run_stream(replay_csv(CSV), get_strategy(name))
+    from_frame = BacktestEngine(initial_balance=1000).run_stream(replay_frame(data), get_strategy(name))
+    assert by_entry(from_file["trades"]) == by_entry(batch["trades"])
+    assert by_entry(from_frame["trades"]) == by_entry(batch["trades"])
+
+
+# The per-bar rules of the hand-written strategies, bar by bar over one coin's frame
+
+def _rsi(close, period):
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+def _volume_up(df, idx):
+    if "volume" not in df.columns:
+        return True
+    vol_ma = df["volume"].iloc[max(0, idx - 5):idx].mean()
+    return df["volume"].iloc[idx] > vol_ma * 1.2 if vol_ma > 0 else True
+
+
+def reference_rsi_v3(df, idx):
+    rsi = _rsi(df["close"], 14)
+    return idx >= 19 and rsi.iloc[idx] < 40, idx >= 14 and rsi.iloc[idx] > 60
+
+
+def reference_rsi_volume(df, idx):
+    entry, exit_ = reference_rsi_v3(df, idx)
+    if "volume" in df.columns:
+        entry = entry and df["volume"].iloc[idx] > df["volume"].rolling(5).mean().iloc[idx] * 1.2
+    return entry, exit_
+
+
+def reference_vol_momentum_v3(df, idx):
+    close = df["close"]
+    entry = idx >= 8 and close.iloc[idx - 1] > close.iloc[idx - 3] * 1.015 and _volume_up(df, idx)
+    return entry, idx > 2 and close.iloc[idx - 1] < close.iloc[idx - 2] * 0.98
+
+
+def reference_tight_band(df, idx):
+    close = df["close"].iloc[idx]
+    ma = df["close"].rolling(window=10).mean().iloc[idx]
+    return idx >= 10 and close < ma * 0.99, idx >= 10 and close > ma * 1.005
+
+
+def reference_scalper(df, idx):
+    close = df["close"]
+    entry = idx >= 3 and close.iloc[idx - 2] > close.iloc[idx - 3] and close.iloc[idx - 1] > close.iloc[idx - 2]
+    return entry, False
+
+
+REFERENCES = {
+    "rsi_v3": (reference_rsi_v3, {"stop_loss": 3, "take_profit": 6, "max_bars": None}),
+    "rsi_volume": (reference_rsi_volume, {"stop_loss": 3, "take_profit": 6, "max_bars": None}),
+    "vol_momentum_v3": (reference_vol_momentum_v3, {"stop_loss": 2, "take_profit": 4, "max_bars": None}),
+    "tight_band": (reference_tight_band, {"stop_loss": 2, "take_profit": None, "max_bars": None}),
+    "scalper": (reference_scalper, {"stop_loss": 1, "take_profit": 1.5, "max_bars": 4}),
+}
+
+
+def test_every_strategy_has_a_reference():
+    assert set(REFERENCES) == set(STRATEGIES)
+
+
+@pytest.mark.parametrize("volume", [False, True], ids=["no_volume", "volume"])
+@pytest.mark.parametrize("name", REFERENCES)
+def test_rule_signals_match_hand_written(data, name, volume):
+    reference, risk = REFERENCES[name]
+    strategy = get_strategy(name)
+    for df in coin_frames(with_volume(data) if volume else data):
+        signals = strategy.signals(df)
+        expected = [reference(df, idx) for idx in range(len(df))]
+        assert signals["entry"].tolist() == [bool(entry) for entry, _ in expected]
+        assert signals["exit"].tolist() == [bool(exit_) for _, exit_ in expected]
+        assert {key: signals[key] for key in risk} == pytest.approx(risk)